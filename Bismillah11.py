@@ -3,6 +3,23 @@ import pandas as pd
 import os
 import altair as alt
 import re 
+import hashlib
+import tempfile
+from sheet_cache import DiskSheetCache, FolderManifest, ParseCache, SharedDatasetCache, file_hash
+from header_detect import HeaderDetector, header_rows, promote_header
+from ingest import (
+    IngestJob,
+    LazyWorkbook,
+    available_memory,
+    detect_format,
+    read_columns,
+    sheet_plan,
+    split_duplicates,
+)
+from merge import Provenance, compact_frame, merge_frames
+from filter_index import FilterIndex, FilteredView, range_filterable, text_searchable
+from readers import infer_csv_types
+from spool import UploadSpool, memory_copies
 
 # ======================
 # Konfigurasi Tampilan
@@ -45,95 +62,346 @@ st.caption("Header otomatis/manual + nama sheet + filter + visualisasi")
 # ======================
 # Fungsi baca sheet dengan opsi header otomatis/manual
 # ======================
-def read_sheet_with_header_option(file_path, sheet_name=None, header_mode="Otomatis", max_preview=9):
-    """
-    Membaca sheet Excel/ODS dengan opsi header otomatis atau manual.
-    """
-    df = None
-    header_row = None
+def header_label(header_row):
+    """Teks posisi header: 'baris ke-3', atau 'baris ke-3–4' untuk header bertingkat."""
+    rows = header_rows(header_row)
+    if len(rows) == 1:
+        return f"baris ke-{rows[0] + 1}"
+    return f"baris ke-{rows[0] + 1}–{rows[-1] + 1}"
 
-    # Preview untuk manual
-    preview_df = pd.read_excel(file_path, sheet_name=sheet_name, header=None, nrows=max_preview)
 
+def choose_header_row(raw_df, sheet_name=None, header_mode="Otomatis", max_preview=9, key_prefix="", detector=None):
+    """
+    Menentukan baris header dari sheet mentah (header=None), otomatis atau manual.
+    Mengembalikan indeks baris header (tuple untuk header bertingkat), atau None jika tanpa header.
+    """
     if header_mode == "Otomatis":
-        best_score = -1
-        for i in range(max_preview):
-            row_values = preview_df.iloc[i].astype(str)
-            unique_count = len(set(row_values)) - row_values.isin(['nan', 'None']).sum()
-            if unique_count > best_score:
-                best_score = unique_count
-                header_row = i
-        try:
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=header_row)
-            st.success(f"✅ Header otomatis terdeteksi di baris ke-{header_row+1} sheet {sheet_name if sheet_name else ''}")
-        except:
-            st.warning(f"⚠️ Gagal membaca sheet {sheet_name if sheet_name else ''} dengan header otomatis")
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-    else:
-        st.write("Pratinjau 9 baris pertama:")
-        st.dataframe(preview_df)
-        header_row = st.selectbox(
-            f"Pilih baris header untuk sheet {sheet_name if sheet_name else ''} (0 = tanpa header)",
-            list(range(0, max_preview))
-        )
-        try:
-            if header_row == 0:
-                df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-            else:
-                df = pd.read_excel(file_path, sheet_name=sheet_name, header=header_row-1)
-        except:
-            st.warning(f"⚠️ Gagal membaca sheet {sheet_name if sheet_name else ''}")
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+        header_row = (detector or HeaderDetector(max_preview)).detect(raw_df)
+        if header_row is not None:
+            st.success(f"✅ Header otomatis terdeteksi di {header_label(header_row)} sheet {sheet_name if sheet_name else ''}")
+        else:
+            st.warning(f"⚠️ Sheet {sheet_name if sheet_name else ''} kosong, dibaca tanpa header")
+        return header_row
 
-    return df, header_row
+    st.write(f"Pratinjau {max_preview} baris pertama:")
+    st.dataframe(raw_df.head(max_preview))
+    pilihan = st.selectbox(
+        f"Pilih baris header untuk sheet {sheet_name if sheet_name else ''} (0 = tanpa header)",
+        list(range(0, max_preview)),
+        key=f"header_{key_prefix}_{sheet_name}"
+    )
+    return None if pilihan == 0 else pilihan - 1
 
 
 # ======================
 # Pilihan mode unggah
 # ======================
-mode = st.radio("Pilih sumber data:", ["Upload File"])
+mode = st.radio("Pilih sumber data:", ["Upload File", "Pilih Folder"])
 header_mode = st.radio("Bagaimana membaca header?", ["Otomatis", "Manual"])
+if "ingest_job" in st.session_state and st.session_state.get("ingest_mode") != mode:
+    # 🔹 Kunci task upload dan folder berbeda bentuk → job dari mode lain dibatalkan & dibuang
+    st.session_state.pop("ingest_job").cancel()
 data_frames = []
+data_sources = []  # (file, sheet) sejajar dengan data_frames
+dataset = None  # (data_gabungan, provenance, laporan skema, laporan pemadatan)
+dataset_key = None
+
+# ======================
+# Pengaturan deteksi header
+# ======================
+scan_depth = st.sidebar.number_input("Kedalaman pindai header (baris)", min_value=1, max_value=500, value=9)
+max_header_rows = st.sidebar.number_input("Maksimum baris header bertingkat", min_value=1, max_value=5, value=1)
+# 🔹 Detector disimpan per sesi → template header terpakai ulang antar rerun dan antar file
+detector = st.session_state.get("header_detector")
+if detector is None or (detector.scan_depth, detector.max_header_rows) != (scan_depth, max_header_rows):
+    detector = st.session_state["header_detector"] = HeaderDetector(scan_depth, max_header_rows)
+header_config = (header_mode, scan_depth, max_header_rows)
+
+# ======================
+# Cache parsing antar rerun
+# ======================
+cache_mb = st.sidebar.number_input(
+    "Batas cache parsing per sesi (MB)", min_value=16, max_value=65536, value=512
+)
+if "parse_cache" not in st.session_state:
+    st.session_state["parse_cache"] = ParseCache(cache_mb * 2**20)
+parse_cache = st.session_state["parse_cache"]
+parse_cache.resize(cache_mb * 2**20)
+# Nama kolom per isi file (kecil) disimpan terpisah agar tidak terdesak sheet besar di cache parsing
+column_lists = st.session_state.setdefault("column_lists", {})
+
+# ======================
+# Cache dataset bersama lintas sesi (satu salinan per server)
+# ======================
+# Batas memori berlaku untuk seluruh server → diatur lewat environment, bukan widget per sesi
+SHARED_DATASET_MB = int(os.environ.get("GABUNG_SHARED_DATASET_MB", "1024"))
+
+
+@st.cache_resource
+def shared_dataset_cache():
+    return SharedDatasetCache(SHARED_DATASET_MB * 2**20)
+
+
+shared_datasets = shared_dataset_cache()
+
 
+def hold_shared_dataset(key):
+    """Memegang lease dataset bersama yang dipakai sesi ini; lease dataset sebelumnya dilepas."""
+    lease = st.session_state.get("dataset_lease")
+    if lease is not None and lease.key == key:
+        return
+    if lease is not None:
+        lease.release()
+        del st.session_state["dataset_lease"]
+    if key is not None:
+        st.session_state["dataset_lease"] = shared_datasets.lease(key)
+
+
+csv_limit = st.sidebar.number_input(
+    "Batas memori per file CSV (MB, 0 = tanpa batas)", min_value=0, value=0
+) or None
+compact_merged = st.sidebar.checkbox("Padatkan tipe data setelah digabung", value=True)
+check_row_duplicates = st.sidebar.checkbox("Cek baris duplikat antar sumber", value=False)
+spool_mb = st.sidebar.number_input(
+    "Upload di atas ukuran ini disimpan ke file sementara (MB)", min_value=1, value=50
+)
+n_workers = st.sidebar.number_input(
+    "Jumlah proses paralel (mode folder)", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1
+)
+max_filter_options = st.sidebar.number_input(
+    "Maksimum nilai unik untuk daftar pilihan filter (di atasnya memakai pencarian)", min_value=10, value=1000
+)
 
 # ======================
-# Fungsi bantu baca file format apa pun
+# Cache kolumnar di disk (bertahan setelah restart)
 # ======================
-def load_sheets_any_format(uploaded_file):
-    """Membaca file Excel/ODS/CSV secara otomatis, meski formatnya tertukar."""
-    file_name = uploaded_file.name.lower()
+cache_dir = st.sidebar.text_input(
+    "Folder cache disk (kosongkan untuk menonaktifkan)",
+    os.path.join(tempfile.gettempdir(), "gabung_data_cache")
+)
+disk_cache_mb = st.sidebar.number_input(
+    "Batas cache disk (MB)", min_value=16, max_value=1048576, value=2048
+)
+disk_cache = None
+if cache_dir:
     try:
-        # 1️⃣ Prioritas: Excel (openpyxl)
-        if file_name.endswith((".xlsx", ".xls")):
-            try:
-                return pd.read_excel(uploaded_file, sheet_name=None, engine="openpyxl")
-            except:
-                uploaded_file.seek(0)
-                return pd.read_excel(uploaded_file, sheet_name=None, engine="odf")
+        disk_cache = DiskSheetCache(cache_dir, disk_cache_mb * 2**20)
+    except ImportError:
+        st.sidebar.caption("ℹ️ Cache disk butuh paket pyarrow")
+    except OSError as e:
+        st.sidebar.caption(f"ℹ️ Cache disk tidak bisa dipakai: {e}")
 
-        # 2️⃣ Jika file .ods → coba odf dulu
-        elif file_name.endswith(".ods"):
-            try:
-                return pd.read_excel(uploaded_file, sheet_name=None, engine="odf")
-            except:
-                uploaded_file.seek(0)
-                return pd.read_excel(uploaded_file, sheet_name=None, engine="openpyxl")
 
-        # 3️⃣ Jika CSV
-        elif file_name.endswith(".csv"):
-            df = pd.read_csv(uploaded_file)
-            return {"Sheet1": df}
+def save_to_disk_cache(file_key, sheets):
+    """Menyimpan sheet ke cache disk; kegagalan menulis tidak menghentikan aplikasi."""
+    if disk_cache is None:
+        return
+    try:
+        disk_cache.put(file_key, sheets)
+    except OSError as e:
+        st.caption(f"ℹ️ Gagal menulis cache disk: {e}")
+
+
+# ======================
+# Fungsi bantu tampilkan format terdeteksi
+# ======================
+def show_detected_format(file_name, fmt):
+    """Menampilkan format hasil deteksi isi file, dan memberi tahu jika ekstensinya tidak cocok."""
+    ext = os.path.splitext(file_name)[1].lstrip(".").lower()
+    if not fmt or fmt == "unknown":
+        st.warning(f"⚠️ Format {file_name} tidak dikenali dari isinya")
+    elif ext and ext != fmt:
+        st.info(f"🔎 {file_name} terdeteksi sebagai {fmt.upper()} (bukan .{ext})")
+    else:
+        st.caption(f"🔎 Format terdeteksi: {fmt.upper()}")
+
+
+# ======================
+# Fungsi bantu file duplikat
+# ======================
+def show_duplicate_files(duplicates):
+    """Daftar file yang dilewati karena isinya sama persis dengan file lain: [(duplikat, asli), ...]."""
+    duplicates = list(duplicates)
+    if duplicates:
+        with st.expander(f"⏭️ {len(duplicates)} file dilewati karena isinya sama dengan file lain"):
+            for name, original in duplicates:
+                st.write(f"**{name}** = {original}")
+
+
+# ======================
+# Fungsi bantu perkiraan ukuran sebelum parsing
+# ======================
+def estimate_label(estimate):
+    """Teks ringkas perkiraan satu sheet: '1.000×12, ~3.2 MB'."""
+    parts = []
+    if estimate["rows"] is not None:
+        parts.append(f"{estimate['rows']:,}×{estimate['cols']}".replace(",", "."))
+    if estimate["bytes"] is not None:
+        parts.append(f"~{estimate['bytes'] / 2**20:.1f} MB")
+    return ", ".join(parts)
+
+
+def confirm_estimate(estimates):
+    """
+    Ringkasan perkiraan sheet yang akan dibaca [(perkiraan), ...] dan peringatan
+    jika totalnya melebihi memori tersedia. True = boleh mulai membaca.
+    """
+    if not estimates:
+        return True
+    total = sum(e["bytes"] or 0 for e in estimates)
+    in_memory = sum(e["path"] == "memori" for e in estimates)
+    st.caption(
+        f"🧾 Perkiraan sebelum dibaca: {len(estimates)} sheet, ~{total / 2**20:.1f} MB "
+        f"(di memori: {in_memory}, streaming: {len(estimates) - in_memory})"
+    )
+    available = available_memory()
+    if available is None or total <= available * 0.8:
+        return True
+    st.warning(
+        f"⚠️ Perkiraan memori ~{total / 2**20:.0f} MB melebihi memori tersedia "
+        f"{available / 2**20:.0f} MB; data mungkin tidak muat"
+    )
+    return st.checkbox("Tetap baca walau mungkin tidak muat", key="force_load")
 
-        # 4️⃣ Fallback umum
-        else:
-            uploaded_file.seek(0)
-            return pd.read_excel(uploaded_file, sheet_name=None)
 
-    except Exception as e:
-        st.error(f"❌ Gagal membaca {uploaded_file.name}: {e}")
+# ======================
+# Fungsi bantu parsing di latar belakang
+# ======================
+def ingest_job(tasks, usecols=None, workers=1):
+    """
+    Job parsing latar belakang untuk tasks (lihat IngestJob). Job yang sedang
+    berjalan/dibatalkan dipakai ulang selama masih mencakup semua task yang
+    dibutuhkan; kebutuhan berubah (file, sheet, kolom baru) → job lama dibatalkan.
+    Tanpa task baru, job yang sudah selesai tetap disimpan: hasilnya dipegang
+    job (bukan hanya di cache parsing yang bisa membuangnya) sampai diganti.
+    """
+    job = st.session_state.get("ingest_job")
+    keys = {task[0] for task in tasks}
+    if job is not None and keys <= job.keys and (keys or not (job.running or job.cancelled)):
+        return job
+    if job is not None:
+        job.cancel()
+        del st.session_state["ingest_job"]
+    if not tasks:
         return None
+    job = IngestJob(tasks, header_arg, csv_limit, usecols, detector, workers).start()
+    st.session_state["ingest_job"] = job
+    st.session_state["ingest_mode"] = mode
+    return job
+
+
+ICON_STATUS = {
+    IngestJob.WAITING: "⏸️", IngestJob.RUNNING: "⏳", IngestJob.DONE: "✅",
+    IngestJob.FAILED: "❌", IngestJob.CANCELLED: "⛔",
+}
 
 
+@st.fragment(run_every=1.0)
+def show_ingest_progress(job):
+    """Progres per file/sheet; halaman dimuat ulang setiap ada sheet baru yang selesai."""
+    done, total = job.progress()
+    st.progress(done / total, text=f"⏳ Membaca di latar belakang: {done}/{total} bagian selesai")
+    with st.expander("Detail progres"):
+        for (_, _, _, file_name, sheet_names, *_), status in zip(job.tasks, job.status):
+            part = ", ".join(map(str, sheet_names)) if sheet_names else "semua sheet"
+            st.write(f"{ICON_STATUS[status]} {file_name} / {part} — {status}")
+    if st.button("⛔ Batalkan pembacaan"):
+        job.cancel()
+    if job.has_new() or not job.running:
+        st.rerun()
+
+
+def show_ingest_status(job):
+    """Progres job yang berjalan, atau ringkasan job yang dibatalkan dengan tombol lanjutkan."""
+    if job is None:
+        return
+    if job.has_new() and not job.running:
+        # Job selesai setelah hasilnya diambil di awal run ini → ambil sisanya
+        st.rerun()
+    if job.running:
+        show_ingest_progress(job)
+    elif job.cancelled:
+        done, total = job.progress()
+        st.warning(f"⛔ Pembacaan dibatalkan: {done} dari {total} bagian sudah terbaca dan bisa dipakai")
+        if st.button("▶️ Lanjutkan membaca"):
+            del st.session_state["ingest_job"]
+            st.rerun()
+
+
+# ======================
+# Fungsi bantu pilih kolom (baca header saja)
+# ======================
+def cached_columns(source, fmt, content_hash, sheet_names=None):
+    """Nama kolom per sheet dari baca header saja, disimpan per hash isi file."""
+    columns_key = (content_hash, fmt, tuple(sheet_names) if sheet_names else None, header_config)
+    columns = column_lists.get(columns_key)
+    if columns is None:
+        try:
+            columns = read_columns(source, "auto", sheet_names, fmt, detector)
+        except Exception:
+            columns = {}
+        column_lists[columns_key] = columns
+    return columns
+
+
+def choose_columns(column_lists):
+    """
+    Menampilkan pilihan kolom yang dibaca (gabungan nama kolom semua sheet).
+    Hanya di mode header otomatis, karena di mode manual header baru dipilih
+    setelah sheet dibaca. Mengembalikan tuple kolom terpilih, atau None = semua kolom.
+    """
+    options = list(dict.fromkeys(col for columns in column_lists for col in columns))
+    if header_mode != "Otomatis" or not options:
+        return None
+    chosen = st.multiselect(
+        "Pilih kolom yang dibaca (kosongkan = semua kolom)", options, format_func=str, key="usecols"
+    )
+    return tuple(chosen) or None
+
+
+# ======================
+# Fungsi bantu olah sheet hasil parsing
+# ======================
+def collect_sheet_frames(file_name, file_key, sheets, usecols=None):
+    """Menentukan header tiap sheet, menambah metadata, lalu memasukkan ke data_frames."""
+    for sheet_name, df_raw in sheets.items():
+        if df_raw.attrs.get("csv_text_columns"):
+            info = ", ".join(map(str, df_raw.attrs["csv_text_columns"]))
+            st.info(f"ℹ️ Kolom dibaca sebagai teks karena ada nilai yang bukan angka/tanggal: {info}")
+        if "header_row" in df_raw.attrs:
+            # 🔹 Header sudah dideteksi oleh pembaca streaming
+            header_row = df_raw.attrs["header_row"]
+            st.success(f"✅ Header otomatis terdeteksi di {header_label(header_row)} sheet {sheet_name}")
+            df = df_raw
+        else:
+            # 🔹 Tentukan header dari data yang sudah ada di memori
+            header_row = choose_header_row(
+                df_raw, sheet_name, header_mode, scan_depth, key_prefix=file_key[0], detector=detector
+            )
+            sheet_key = file_key + (sheet_name, header_row)
+            df = parse_cache.get(sheet_key)
+            if df is None:
+                try:
+                    df = promote_header(df_raw, header_row)
+                except Exception as e:
+                    st.warning(f"⚠️ Gagal memakai header untuk {sheet_name} ({e}), baca tanpa header.")
+                    df = df_raw.copy()
+                if df_raw.attrs.get("csv_raw"):
+                    # 🔹 CSV mentah dibaca sebagai teks → tipe kolom ditentukan setelah header dipilih
+                    df = infer_csv_types(df)
+                parse_cache.put(sheet_key, df)
+
+        # 🔹 Pembaca yang tidak bisa memproyeksikan kolom (XLS) → pilih kolom di sini
+        if usecols is not None and not df.columns.isin(usecols).all():
+            df = df[[col for col in df.columns if col in usecols]]
+
+        # 🔹 Asal file & sheet dicatat per sumber, bukan per baris (lihat Provenance)
+        data_frames.append(df)
+        data_sources.append((file_name, sheet_name))
+
+
+header_arg = "auto" if header_mode == "Otomatis" else None
+
 # ======================
 # Mode Upload File
 # ======================
@@ -144,44 +412,435 @@ if mode == "Upload File":
         accept_multiple_files=True
     )
 
+    # 🔹 Upload besar disimpan ke file sementara per sesi (dihapus saat sesi berakhir)
+    if "upload_spool" not in st.session_state:
+        st.session_state["upload_spool"] = UploadSpool()
+    spool = st.session_state["upload_spool"]
+    spool.threshold_bytes = spool_mb * 2**20
+
+    plans = []
+    uploaded_files = uploaded_files or []
+    # 🔹 Hash isi per upload dihitung sekali (file_id tetap selama upload yang sama),
+    # bukan dibaca ulang seluruhnya di setiap rerun; upload yang sudah dilepas dibuang
+    upload_hashes = st.session_state.setdefault("upload_hashes", {})
+    for file_id in set(upload_hashes) - {uploaded_file.file_id for uploaded_file in uploaded_files}:
+        del upload_hashes[file_id]
+    for uploaded_file in uploaded_files:
+        if uploaded_file.file_id not in upload_hashes:
+            upload_hashes[uploaded_file.file_id] = file_hash(uploaded_file)
+    content_hashes = [upload_hashes[uploaded_file.file_id] for uploaded_file in uploaded_files]
     if uploaded_files:
-        for uploaded_file in uploaded_files:
-            st.markdown(f"### 📄 {uploaded_file.name}")
-            sheets = load_sheets_any_format(uploaded_file)
+        # 🔹 Upload yang isinya sama persis dengan upload lain tidak di-parse lagi
+        uploads, duplicates = split_duplicates(list(zip(uploaded_files, content_hashes)), content_hashes)
+        show_duplicate_files((dup.name, first.name) for (dup, _), (first, _) in duplicates)
+        for uploaded_file, content_hash in uploads:
+            container = st.container()
+            with container:
+                st.markdown(f"### 📄 {uploaded_file.name}")
+
+                try:
+                    source = spool.source(uploaded_file, content_hash)
+                except OSError as e:
+                    st.caption(f"ℹ️ Gagal menyimpan ke file sementara, dibaca dari memori: {e}")
+                    source = uploaded_file
+                copies = memory_copies(uploaded_file)
+                if source is not uploaded_file:
+                    st.caption(
+                        f"💾 {uploaded_file.size / 2**20:.1f} MB dibaca dari file sementara; "
+                        f"salinan di memori: {copies}"
+                    )
+                else:
+                    st.caption(f"🧮 Salinan isi file di memori: {copies}")
+
+                fmt = detect_format(source)
+                show_detected_format(uploaded_file.name, fmt)
+                file_key = (content_hash, fmt, header_config)
+
+                # 🔹 Daftar sheet & dimensi dari metadata workbook (tanpa parsing sel)
+                meta_key = file_key[:2] + ("meta",)
+                try:
+                    workbook = LazyWorkbook(source, fmt, parse_cache.get(meta_key))
+                except Exception as e:
+                    st.error(f"❌ Gagal membaca {uploaded_file.name}: {e}")
+                    continue
+                parse_cache.put(meta_key, workbook.sheets)
+                try:
+                    estimates = workbook.estimate()
+                except Exception:
+                    estimates = {}
+
+                selected = workbook.sheet_names
+                if len(selected) == 1 and selected[0] in estimates:
+                    st.caption(f"🧾 Perkiraan: {estimate_label(estimates[selected[0]])}")
+                if len(selected) > 1:
+                    dims = {
+                        name: f" ({estimate_label(estimates[name])})" if name in estimates else ""
+                        for name in workbook.sheet_names
+                    }
+                    selected = st.multiselect(
+                        f"Pilih sheet yang digabung dari {uploaded_file.name}",
+                        workbook.sheet_names,
+                        default=workbook.non_empty_sheets(),
+                        format_func=lambda name, dims=dims: f"{name}{dims[name]}",
+                        key=f"sheets_{content_hash}"
+                    )
+            plans.append((uploaded_file, source, container, fmt, file_key, selected, estimates))
+    spool.retain(content_hashes)
+
+    if plans:
+
+        # 🔹 Pilih kolom dari header saja, sebelum isi sheet di-parse
+        usecols = None
+        if header_mode == "Otomatis":
+            usecols = choose_columns(
+                columns
+                for _, source, _, fmt, file_key, selected, _ in plans if selected
+                for columns in cached_columns(source, fmt, file_key[0], selected).values()
+            )
+
+        # 🔹 Sumber & pengaturan sama sudah dimuat sesi lain → dataset dipakai bersama tanpa parsing
+        if header_mode == "Otomatis":
+            dataset_key = (
+                "upload",
+                tuple((u.name, file_key, tuple(selected)) for u, _, _, _, file_key, selected, _ in plans),
+                usecols, compact_merged, csv_limit,
+            )
+            dataset = shared_datasets.get(dataset_key)
+        parse_plans = plans if dataset is None else []
+
+        # 🔹 Sheet yang selesai dibaca job latar belakang → masuk cache
+        fresh = set()
+        job = st.session_state.get("ingest_job")
+        if job is not None:
+            for (file_key, _, task_usecols), sheets, error in job.take():
+                fresh.add(file_key)
+                for sheet_name, df in (sheets or {}).items():
+                    sheet_key = file_key + ("sheet", sheet_name, task_usecols)
+                    parse_cache.put(sheet_key, df)
+                    save_to_disk_cache(sheet_key, {sheet_name: df})
+
+        # 🔹 Hanya sheet terpilih yang belum ada di cache yang di-parse (per sheet, di latar belakang)
+        available = []
+        tasks = []
+        pending_estimates = []
+        for uploaded_file, source, container, fmt, file_key, selected, estimates in parse_plans:
+            sheets = {}
+            for sheet_name in selected:
+                sheet_key = file_key + ("sheet", sheet_name, usecols)
+                df = parse_cache.get(sheet_key)
+                if df is None and disk_cache is not None:
+                    cached = disk_cache.get(sheet_key)
+                    if cached is not None:
+                        df = cached[sheet_name]
+                        parse_cache.put(sheet_key, df)
+                if df is None and job is not None:
+                    # Hasil job tetap dipegang job → sheet yang terdesak dari cache diambil dari sana
+                    task_key = (file_key, sheet_name if fmt in ("xlsx", "ods", "xls") else None, usecols)
+                    df = (job.sheets(task_key) or {}).get(sheet_name)
+                if df is not None:
+                    sheets[sheet_name] = df
+            for sheet_name in selected:
+                if sheet_name not in sheets:
+                    sheet_names = [sheet_name] if fmt in ("xlsx", "ods", "xls") else None
+                    key = (file_key, sheet_name if sheet_names else None, usecols)
+                    # 🔹 Jalur baca dari perkiraan: CSV kecil satu chunk di memori, sisanya streaming per chunk
+                    estimate = estimates.get(sheet_name)
+                    chunk_rows = estimate["chunk_rows"] if estimate else None
+                    tasks.append((key, file_key, source, uploaded_file.name, sheet_names, fmt, chunk_rows))
+                    if estimate and (not job or key not in job.keys):
+                        pending_estimates.append(estimate)
+            available.append(sheets)
+        if not confirm_estimate(pending_estimates):
+            tasks = []
+        job = ingest_job(tasks, usecols)
+        show_ingest_status(job)
+
+        for (uploaded_file, _, container, _, file_key, selected, _), sheets in zip(parse_plans, available):
+            with container:
+                in_job = job is not None and file_key in job.groups
+                if in_job:
+                    for (_, sheet_name, _), error in job.errors(file_key):
+                        st.error(f"❌ Gagal membaca {uploaded_file.name} {sheet_name or ''}: {error}")
+                    pending = len(selected) - len(sheets) - len(job.errors(file_key))
+                    if pending > 0:
+                        st.info(f"⏳ {len(sheets)} sheet dari {uploaded_file.name} siap, {pending} masih dibaca")
+                elif sheets and file_key not in fresh:
+                    st.info(f"♻️ {len(sheets)} sheet dari {uploaded_file.name} memakai hasil parsing dari cache")
+
+                sheets = {name: sheets[name] for name in selected if name in sheets}
+                if sheets:
+                    collect_sheet_frames(uploaded_file.name, file_key, sheets, usecols)
+
+# ======================
+# Mode Pilih Folder
+# ======================
+elif mode == "Pilih Folder":
+    folder = st.text_input("Masukkan path folder (isi file .xlsx/.ods/.csv)")
+    if folder and os.path.isdir(folder):
+        files = [
+            (os.path.join(folder, fname), fname)
+            for fname in sorted(os.listdir(folder))
+            if fname.lower().endswith((".xlsx", ".xls", ".ods", ".csv"))
+        ]
+
+        # 🔹 Manifest (ukuran, mtime, hash) per folder & mode header disimpan antar rerun
+        manifest_key = f"manifest::{os.path.abspath(folder)}::{header_config}"
+        manifest_path = None
+        if disk_cache is not None:
+            manifest_name = hashlib.sha1(manifest_key.encode()).hexdigest()
+            manifest_path = os.path.join(disk_cache.cache_dir, f"manifest-{manifest_name}.json")
+        if manifest_key not in st.session_state:
+            st.session_state[manifest_key] = (
+                FolderManifest.load(manifest_path) if manifest_path else FolderManifest()
+            )
+        manifest = st.session_state[manifest_key]
+        changed, deleted = manifest.scan(fpath for fpath, _ in files)
+
+        # 🔹 File yang isinya sama persis dengan file lain di folder dilewati
+        files, duplicates = split_duplicates(files, [manifest.hash(fpath) for fpath, _ in files])
+        show_duplicate_files((dup, first) for (_, dup), (_, first) in duplicates)
 
+        # 🔹 Pilih kolom dari header saja; jika pilihan berubah semua file di-parse ulang
+        usecols = None
+        if header_mode == "Otomatis":
+            usecols = choose_columns(
+                columns
+                for fpath, _ in files
+                for columns in cached_columns(
+                    fpath, manifest.format(fpath) or detect_format(fpath), manifest.hash(fpath)
+                ).values()
+            )
+        usecols_key = manifest_key + "::usecols"
+        if st.session_state.get(usecols_key) != usecols:
+            st.session_state[usecols_key] = usecols
+            changed = manifest.reset_sheets()
+
+        # 🔹 Sumber & pengaturan sama sudah dimuat sesi lain → dataset dipakai bersama tanpa parsing
+        if header_mode == "Otomatis":
+            dataset_key = (
+                "folder",
+                tuple((fname, manifest.hash(fpath)) for fpath, fname in files),
+                header_config, usecols, compact_merged, csv_limit,
+            )
+            dataset = shared_datasets.get(dataset_key)
+        parse_files = files if dataset is None else []
+
+        # 🔹 File yang semua bagiannya selesai dibaca job latar belakang → manifest & cache disk
+        stored = 0
+        job = st.session_state.get("ingest_job")
+        if job is not None:
+            for group in dict.fromkeys(key[:-1] for key, *_ in job.take()):
+                fpath, digest, fmt, task_usecols = group
+                result = job.group_result(group)
+                if result is None or fpath not in manifest.entries or manifest.hash(fpath) != digest:
+                    continue
+                if task_usecols != usecols:
+                    continue
+                sheets, error = result
+                manifest.store(fpath, sheets, error, fmt)
+                if sheets:
+                    save_to_disk_cache((digest, fmt, header_config, usecols), sheets)
+                stored += 1
+
+        # 🔹 File baru/berubah: coba cache disk dulu, sisanya di-parse di latar belakang (paralel)
+        to_parse = []
+        tasks = []
+        pending_estimates = []
+        from_disk = 0
+        for fpath, fname in parse_files:
+            if manifest.sheets(fpath) is not None or manifest.error(fpath) is not None:
+                continue
+            fmt = detect_format(fpath)
+            sheets = None
+            if disk_cache is not None:
+                sheets = disk_cache.get((manifest.hash(fpath), fmt, header_config, usecols))
+            if sheets is not None:
+                manifest.store(fpath, sheets, None, fmt)
+                from_disk += 1
+                continue
+            to_parse.append((fpath, fname))
+            group = (fpath, manifest.hash(fpath), fmt, usecols)
+            meta_key = (manifest.hash(fpath), fmt, "meta")
+            try:
+                # Workbook XLSX dipecah per sheet agar progres terlihat per sheet
+                plan = sheet_plan(fpath, fmt, split_sheets_bytes=0)
+                workbook = LazyWorkbook(fpath, fmt, parse_cache.get(meta_key))
+                parse_cache.put(meta_key, workbook.sheets)
+                estimates = workbook.estimate()
+            except Exception:
+                plan, estimates = [None], {}
+            for sheet_names in plan:
+                key = group + (tuple(sheet_names) if sheet_names else None,)
+                # 🔹 Jalur baca dari perkiraan; task berisi banyak sheet → di memori hanya jika semuanya kecil
+                parts = [estimates.get(name) for name in (sheet_names or estimates)]
+                in_memory = parts and all(e and e["path"] == "memori" for e in parts)
+                chunk_rows = max(e["chunk_rows"] for e in parts) if in_memory else None
+                tasks.append((key, group, fpath, fname, sheet_names, fmt, chunk_rows))
+                if not job or key not in job.keys:
+                    pending_estimates.extend(e for e in parts if e)
+        if not confirm_estimate(pending_estimates):
+            tasks = []
+        job = ingest_job(tasks, usecols, n_workers)
+        show_ingest_status(job)
+        if manifest_path and (changed or deleted or stored or from_disk):
+            manifest.save(manifest_path)
+        st.caption(
+            f"🔄 Sinkronisasi folder: {len(files)} file, {len(to_parse)} sedang di-parse, "
+            f"{from_disk} dari cache disk, {len(deleted)} terhapus, "
+            f"{len(files) - len(to_parse) - from_disk} dari memori"
+        )
+
+        for fpath, fname in parse_files:
+            st.markdown(f"### 📄 {fname}")
+            sheets = manifest.sheets(fpath)
+            if sheets is None and manifest.error(fpath) is None:
+                st.caption("⏳ Belum selesai dibaca")
+                continue
+            show_detected_format(fname, manifest.format(fpath))
+            if manifest.error(fpath) is not None:
+                st.error(f"❌ Gagal membaca {fname}: {manifest.error(fpath)}")
+                continue
             if sheets:
-                for sheet_name, df_raw in sheets.items():
-                    try:
-                        # 🔹 Deteksi otomatis header
-                        preview_df = pd.read_excel(uploaded_file, sheet_name=sheet_name, header=None, nrows=10)
-                        best_row = 0
-                        best_score = -1
-                        for i in range(len(preview_df)):
-                            row_values = preview_df.iloc[i].astype(str)
-                            unique_vals = len(set(row_values)) - row_values.isin(['nan', 'None', '']).sum()
-                            if unique_vals > best_score:
-                                best_score = unique_vals
-                                best_row = i
-
-                        # Baca ulang sheet dengan header terbaik
-                        df = pd.read_excel(uploaded_file, sheet_name=sheet_name, header=best_row)
-                        st.success(f"✅ Header otomatis di baris ke-{best_row+1} untuk {sheet_name}")
-
-                    except Exception as e:
-                        st.warning(f"⚠️ Gagal mendeteksi header untuk {sheet_name} ({e}), baca tanpa header.")
-                        df = pd.read_excel(uploaded_file, sheet_name=sheet_name, header=None)
-
-                    # 🔹 Tambahkan metadata file & sheet
-                    df["__FILE__"] = uploaded_file.name
-                    df["__SHEET__"] = sheet_name0
-        
+                file_key = (manifest.hash(fpath), manifest.format(fpath), header_config)
+                collect_sheet_frames(fname, file_key, sheets, usecols)
+
+if detector.hits:
+    # Hitungan sesi ini, termasuk deteksi di proses pekerja (digabung saat task selesai)
+    st.caption(
+        f"🧩 Deteksi header sesi ini: {detector.hits} dari {detector.hits + detector.misses} "
+        "memakai ulang template yang sama"
+    )
+
+# ======================
+# Widget filter dari katalog nilai
+# ======================
+def choose_filter_values(filter_index, kol, rows):
+    """
+    Multiselect nilai untuk satu kolom filter dari katalog nilai + jumlah baris
+    (di-cache per dataset). Kolom dengan nilai unik melebihi max_filter_options
+    memakai kotak pencarian: hanya nilai teratas yang cocok yang dikirim ke browser.
+    """
+    key = f"filter_values_{kol}"
+    terpilih = st.session_state.get(key, [])
+    catalog = filter_index.catalog(kol, rows)
+    if len(catalog) > max_filter_options:
+        query = st.text_input(f"Cari nilai untuk {kol}", key=f"filter_search_{kol}")
+        total = len(catalog)
+        catalog = filter_index.search(kol, query, rows, limit=max_filter_options)
+        st.caption(f"🔎 {total:,} nilai unik — {len(catalog):,} teratas yang cocok ditampilkan")
+    jumlah = dict(zip(catalog["nilai"].tolist(), catalog["jumlah"].tolist()))
+    # 🔹 Nilai yang sudah dipilih tetap jadi pilihan walau tidak ada di hasil pencarian
+    options = [v for v in terpilih if v not in jumlah] + list(jumlah)
+    return st.multiselect(
+        f"Pilih nilai untuk {kol}", options, key=key,
+        format_func=lambda v: f"{v} ({jumlah[v]:,})" if v in jumlah else str(v),
+    )
+
+
+FILTER_MODES = ["Pilih nilai", "Antara", "≥ (minimal)", "≤ (maksimal)", "N terbesar", "N terkecil"]
+
+
+def filter_column(filter_index, kol, rows):
+    """
+    Widget filter satu kolom → posisi baris yang lolos. Kolom angka/tanggal
+    juga bisa difilter dengan rentang atau N teratas, dijawab dari indeks
+    terurut (pencarian biner) tanpa memindai kolom.
+    """
+    mode = FILTER_MODES[0]
+    if range_filterable(filter_index.df[kol]):
+        mode = st.selectbox(f"Jenis filter untuk {kol}", FILTER_MODES, key=f"filter_mode_{kol}")
+    if mode == "Pilih nilai":
+        return filter_index.select(kol, choose_filter_values(filter_index, kol, rows), rows)
+
+    sorted_index = filter_index.sorted_column(kol)
+    bounds = sorted_index.bounds()
+    if bounds is None:
+        st.caption(f"ℹ️ Kolom {kol} kosong semua")
+        return rows
+    if mode in ("N terbesar", "N terkecil"):
+        n = st.number_input(f"Jumlah baris untuk {kol}", min_value=1, value=10, key=f"filter_n_{kol}")
+        return filter_index.top(kol, n, rows, largest=mode == "N terbesar")
+
+    if sorted_index.is_datetime:
+        # 🔹 Jendela tanggal: batas atas dihitung sampai akhir hari (eksklusif hari berikutnya)
+        first, last = (pd.Timestamp(b).date() for b in bounds)
+        if mode == "Antara":
+            window = st.date_input(f"Rentang tanggal {kol}", (first, last), key=f"filter_range_{kol}")
+            lo, hi = (tuple(window) + (None, None))[:2]
+        elif mode == "≥ (minimal)":
+            lo, hi = st.date_input(f"Mulai tanggal {kol}", first, key=f"filter_lo_{kol}"), None
+        else:
+            lo, hi = None, st.date_input(f"Sampai tanggal {kol}", last, key=f"filter_hi_{kol}")
+        hi = None if hi is None else pd.Timestamp(hi) + pd.Timedelta(days=1)
+        return filter_index.between(kol, lo, hi, rows, include_hi=False)
+
+    first, last = (b.item() for b in bounds)
+    lo = hi = None
+    if mode in ("Antara", "≥ (minimal)"):
+        lo = st.number_input(f"Dari {kol}", value=first, key=f"filter_lo_{kol}")
+    if mode in ("Antara", "≤ (maksimal)"):
+        hi = st.number_input(f"Sampai {kol}", value=last, key=f"filter_hi_{kol}")
+    return filter_index.between(kol, lo, hi, rows)
+
 
 # ======================
 # Gabungkan Data
 # ======================
-if data_frames:
-    data_gabungan = pd.concat(data_frames, ignore_index=True, axis=0)
+if dataset is None and data_frames:
+    data_gabungan, merge_report = merge_frames(data_frames, [f"{f} / {s}" for f, s in data_sources])
+    provenance = Provenance.from_frames(data_frames, data_sources)
+    compact_report = None
+    if compact_merged:
+        data_gabungan, compact_report = compact_frame(data_gabungan)
+    # 🔹 __FILE__/__SHEET__ sebagai kategori berkode per sumber (beberapa byte per baris)
+    data_gabungan = provenance.attach(data_gabungan)
+    # 🔹 Indeks filter ikut dataset (dibangun per kolom saat pertama difilter)
+    filter_index = FilterIndex(data_gabungan)
+    dataset = (data_gabungan, provenance, merge_report, compact_report, filter_index)
+    if dataset_key is not None and st.session_state.get("ingest_job") is None:
+        # 🔹 Dataset lengkap → disimpan sekali untuk semua sesi dengan sumber & pengaturan sama;
+        # ukurannya ikut indeks filter yang tumbuh setiap kali kolom baru difilter
+        data_bytes = int(data_gabungan.memory_usage(deep=True).sum())
+        dataset = shared_datasets.put(dataset_key, dataset, lambda: data_bytes + filter_index.nbytes())
+    else:
+        dataset_key = None
+hold_shared_dataset(dataset_key if dataset is not None else None)
+
+if dataset is not None:
+    data_gabungan, provenance, merge_report, compact_report, filter_index = dataset
+    base_rows = None
     st.subheader("📄 Data Gabungan")
+    if dataset_key is not None and shared_datasets.refs(dataset_key) > 1:
+        st.caption(f"🤝 Dataset dipakai bersama {shared_datasets.refs(dataset_key)} sesi (satu salinan di server)")
+    if compact_report is not None:
+        st.caption(
+            f"🗜️ Memori data gabungan: {compact_report['before'] / 2**20:.1f} MB → "
+            f"{compact_report['after'] / 2**20:.1f} MB ({len(compact_report['columns'])} kolom dipadatkan)"
+        )
+    if check_row_duplicates:
+        # 🔹 Hash isi tiap baris (vektor) → baris yang sudah ada di sumber lain
+        data_columns = [col for col in data_gabungan.columns if col not in Provenance.COLUMNS]
+        duplicate_mask = filter_index.duplicates(provenance, data_columns)
+        if duplicate_mask.any():
+            counts = pd.Series(provenance.source_codes()[duplicate_mask]).value_counts(sort=False).sort_index()
+            with st.expander(f"🔁 {duplicate_mask.sum()} baris sama persis dengan baris dari sumber lain"):
+                for source, n in counts.items():
+                    st.write(f"**{provenance.label(source)}**: {n} baris")
+            if st.checkbox("Buang baris duplikat antar sumber"):
+                data_gabungan = data_gabungan[~duplicate_mask]
+                base_rows = data_gabungan.index.to_numpy()
+        else:
+            st.caption("🔁 Tidak ada baris duplikat antar sumber")
+    if merge_report["missing"] or merge_report["conflicts"]:
+        with st.expander(
+            f"⚠️ Skema berbeda: {len(merge_report['missing'])} sumber kekurangan kolom, "
+            f"{len(merge_report['conflicts'])} kolom bertipe campuran"
+        ):
+            for source, columns in merge_report["missing"].items():
+                st.write(f"**{source}** tidak punya kolom: {', '.join(map(str, columns))}")
+            for column, types in merge_report["conflicts"].items():
+                detail = ", ".join(f"{source} ({dtype})" for source, dtype in types.items())
+                st.write(f"Kolom **{column}** → {merge_report['dtypes'][column]}: {detail}")
     st.dataframe(data_gabungan)
     st.session_state["data_gabungan"] = data_gabungan
 
@@ -189,20 +848,41 @@ if data_frames:
     # Filter Data
     # ======================
     st.subheader("🔍 Penyaringan Data")
+    filter_rows = base_rows
+
+    # 🔹 Pencarian teks global: indeks trigram atas nilai unik semua kolom teks,
+    # dibangun sekali saat pencarian pertama; hasilnya jadi titik awal filter kolom
+    text_columns = [
+        col for col in data_gabungan.columns
+        if col not in Provenance.COLUMNS and text_searchable(data_gabungan[col])
+    ]
+    if text_columns:
+        query = st.text_input("🔎 Cari di semua kolom teks (mis. nomor faktur atau potongan nama)", key="text_search")
+        if query.strip():
+            filter_rows = filter_index.search_text(query, text_columns, filter_rows)
+            text_index = filter_index.text_index(text_columns)
+            st.caption(
+                f"🔎 {len(filter_rows):,} baris memuat \"{query.strip()}\" · indeks trigram: "
+                f"{len(text_index):,} nilai unik dari {len(text_columns)} kolom, "
+                f"{text_index.nbytes() / 2**20:.1f} MB, dibangun dalam {text_index.build_seconds:.2f} detik"
+            )
+
     filter_columns = st.multiselect("Pilih kolom untuk filter", data_gabungan.columns)
 
-    filtered_df = data_gabungan.copy()
+    # 🔹 Indeks per kolom (nilai → baris, atau nilai terurut untuk rentang):
+    # posisi baris disempitkan kolom demi kolom tanpa memindai atau menyalin data
     tampilkan_kolom = []
 
     for kol in filter_columns:
-        unique_vals = filtered_df[kol].dropna().unique().tolist()
-        pilihan = st.multiselect(f"Pilih nilai untuk {kol}", unique_vals)
+        filter_rows = filter_column(filter_index, kol, filter_rows)
         tampilkan_kolom.append(kol)
-        if pilihan:
-            filtered_df = filtered_df[filtered_df[kol].isin(pilihan)]
+    # 🔹 Indeks baru menambah memori dataset bersama → dataset lain tanpa lease dibuang bila lewat batas
+    shared_datasets.trim()
 
-    if tampilkan_kolom:
-        filtered_df = filtered_df[tampilkan_kolom]
+    # 🔹 Hasil filter = posisi baris + kolom tampilan; data baru diambil oleh
+    # konsumennya (tabel/ekspor di bawah, grafik hanya kolom X dan Y)
+    filtered = FilteredView(dataset[0], filter_rows, tampilkan_kolom)
+    filtered_df = filtered.frame()
 
     st.write("### Data Setelah Penyaringan")
     st.dataframe(filtered_df)
@@ -232,22 +912,20 @@ from odf.opendocument import OpenDocumentSpreadsheet
 from odf.table import Table, TableRow, TableCell
 from odf.text import P
 
-if data_frames:
-    if 'filtered_df' not in locals():
-        filtered_df = data_gabungan.copy()
+if dataset is not None:
     # Pastikan kolom identifikasi file dan sheet ada
     if "__FILE__" not in data_gabungan.columns:
         data_gabungan["__FILE__"] = "Tidak diketahui"
     if "__SHEET__" not in data_gabungan.columns:
         data_gabungan["__SHEET__"] = "Tidak diketahui"
-    if not filtered_df.empty and len(filtered_df.columns) > 1:
+    if not filtered.empty and len(filtered.columns) > 1:
         st.subheader("📈 Visualisasi Data")
 
-        # Bersihkan nama kolom
-        filtered_df.columns = [
-            str(c).strip().replace(":", "_").replace(" ", "_") for c in filtered_df.columns
-        ]
-        all_cols = filtered_df.columns.tolist()
+        # Bersihkan nama kolom (nama bersih → nama asli di dataset)
+        clean_names = {
+            str(c).strip().replace(":", "_").replace(" ", "_"): c for c in filtered.columns
+        }
+        all_cols = list(clean_names)
 
         # Pilihan kolom X dan Y
         x_col = st.selectbox("Pilih kolom X (kategori atau numerik)", all_cols)
@@ -257,8 +935,10 @@ if data_frames:
             ["Diagram Batang", "Diagram Garis", "Diagram Sebar"]
         )
 
-        # Pastikan kolom tidak kosong
-        df_vis = filtered_df.dropna(subset=[x_col, y_col], how="any").copy()
+        # Pastikan kolom tidak kosong (hanya kolom X dan Y yang diambil dari dataset)
+        df_vis = filtered.frame([clean_names[x_col], clean_names[y_col]])
+        df_vis.columns = [x_col, y_col]
+        df_vis = df_vis.dropna(subset=[x_col, y_col], how="any")
 
         # Ganti string kosong jadi "Kosong"
         df_vis[x_col] = df_vis[x_col].replace("", "Kosong")
@@ -0,0 +1,420 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from merge import _code_dtype
+
+
+# ======================
+# Indeks terbalik nilai → baris
+# ======================
+def _row_dtype(n):
+    return np.int32 if n < 2**31 else np.int64
+
+
+class ColumnIndex:
+    """
+    Indeks terbalik satu kolom: kode nilai per baris (factorize) plus daftar
+    posting, yaitu posisi baris terurut per nilai yang disimpan bersambung:
+    baris untuk nilai ke-k = order[offsets[k]:offsets[k + 1]].
+    Nilai kosong (NaN/None) tidak masuk posting (kode -1).
+    """
+
+    def __init__(self, series):
+        codes, uniques = pd.factorize(series)
+        self.values = pd.Index(uniques)
+        self.codes = codes.astype(_code_dtype(len(uniques)))
+        # 🔹 argsort stabil atas kode kecil → posisi baris per nilai tetap terurut
+        order = np.argsort(self.codes, kind="stable").astype(_row_dtype(len(codes)))
+        counts = np.bincount(codes + 1, minlength=len(uniques) + 1)
+        self.order = order[counts[0]:]
+        self.offsets = np.concatenate([[0], np.cumsum(counts[1:])])
+        self._catalog = None
+        self._keys = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def nbytes(self):
+        nbytes = self.codes.nbytes + self.order.nbytes + self.offsets.nbytes + self.values.memory_usage(deep=True)
+        if self._keys is not None:
+            nbytes += int(self._keys.memory_usage(deep=True))
+        if self._catalog is not None:
+            nbytes += int(self._catalog.memory_usage(deep=True).sum())
+        return nbytes
+
+    def codes_of(self, values):
+        """Kode untuk nilai-nilai terpilih; nilai yang tidak ada diabaikan."""
+        codes = self.values.get_indexer(list(values))
+        return np.unique(codes[codes >= 0])
+
+    def rows(self, values):
+        """Posisi baris (terurut) yang nilainya termasuk `values`."""
+        return self.rows_of_codes(self.codes_of(values))
+
+    def rows_of_codes(self, codes):
+        """Posisi baris (terurut) untuk kode-kode nilai (unik, terurut)."""
+        if len(codes) > 256:
+            # 🔹 Banyak nilai sekaligus → satu pass tabel kode lebih murah daripada menggabung posting
+            lookup = np.zeros(len(self.values) + 1, dtype=bool)
+            lookup[codes] = True
+            return np.flatnonzero(lookup[self.codes]).astype(self.order.dtype)
+        postings = [self.order[self.offsets[k]:self.offsets[k + 1]] for k in codes]
+        if not postings:
+            return self.order[:0]
+        if len(postings) == 1:
+            return postings[0]
+        return np.sort(np.concatenate(postings))
+
+    def matches(self, values, rows):
+        """Bagian dari `rows` yang nilainya termasuk `values` (cek kode per baris kandidat)."""
+        lookup = np.zeros(len(self.values) + 1, dtype=bool)
+        lookup[self.codes_of(values)] = True
+        # kode -1 (kosong) jatuh ke elemen terakhir yang selalu False
+        return rows[lookup[self.codes[rows]]]
+
+    def counts(self, rows=None):
+        """Jumlah baris per kode nilai, di semua baris atau hanya di `rows`."""
+        if rows is None:
+            return np.diff(self.offsets)
+        return np.bincount(self.codes[rows] + 1, minlength=len(self.values) + 1)[1:]
+
+    def catalog(self, rows=None):
+        """
+        Katalog nilai unik: DataFrame nilai + jumlah baris (indeks = kode),
+        terbanyak dulu. Katalog semua baris dihitung sekali per kolom; untuk
+        `rows` hanya hitungan per kode yang diulang.
+        """
+        if rows is None and self._catalog is not None:
+            return self._catalog
+        counts = self.counts(rows)
+        codes = np.flatnonzero(counts)
+        codes = codes[np.argsort(-counts[codes], kind="stable")]
+        catalog = pd.DataFrame({"nilai": self.values[codes], "jumlah": counts[codes]}, index=codes)
+        if rows is None:
+            self._catalog = catalog
+        return catalog
+
+    def keys(self):
+        """Teks huruf kecil tiap nilai unik (urutan kode), dibuat sekali untuk pencarian."""
+        if self._keys is None:
+            self._keys = pd.Series(self.values.astype(str), dtype="str").str.lower()
+        return self._keys
+
+    def search(self, query, rows=None, limit=100):
+        """
+        Nilai katalog yang cocok dengan `query` (tanpa beda huruf besar/kecil):
+        yang diawali query dulu, lalu yang memuatnya, masing-masing terbanyak
+        dulu. Pencarian berjalan atas nilai unik, bukan atas baris.
+        """
+        catalog = self.catalog(rows)
+        query = str(query).strip().lower()
+        if not query:
+            return catalog.head(limit)
+        keys = self.keys().iloc[catalog.index]
+        starts = keys.str.startswith(query).to_numpy()
+        contains = keys.str.contains(query, regex=False).to_numpy()
+        return pd.concat([catalog[starts], catalog[contains & ~starts]]).head(limit)
+
+
+# ======================
+# Indeks terurut untuk filter rentang
+# ======================
+def range_filterable(series):
+    """Kolom angka (bukan boolean) atau tanggal bisa difilter dengan rentang."""
+    dtype = series.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return True
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+class SortedIndex:
+    """
+    Indeks terurut satu kolom angka/tanggal: posisi baris diurutkan menurut
+    nilainya (argsort stabil, nilai kosong tidak ikut), plus salinan nilai
+    terurut untuk pencarian biner. Rentang [lo, hi] = satu irisan order,
+    jadi biayanya O(log n + k).
+    """
+
+    def __init__(self, series):
+        self.is_datetime = pd.api.types.is_datetime64_any_dtype(series.dtype)
+        if self.is_datetime:
+            if getattr(series.dtype, "tz", None) is not None:
+                series = series.dt.tz_localize(None)
+            values = series.to_numpy(dtype="datetime64[ns]")
+        elif series.hasnans:
+            values = series.to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            values = series.to_numpy(dtype=getattr(series.dtype, "numpy_dtype", None))
+        self.values = values
+        self.present = series.notna().to_numpy()
+        rows = np.flatnonzero(self.present).astype(_row_dtype(len(values)))
+        self.order = rows[np.argsort(values[rows], kind="stable")]
+        self.sorted = values[self.order]
+
+    def nbytes(self):
+        return self.values.nbytes + self.present.nbytes + self.order.nbytes + self.sorted.nbytes
+
+    def key(self, value):
+        """Batas query dalam tipe nilai terurut (tanggal → datetime64[ns])."""
+        if self.is_datetime:
+            return pd.Timestamp(value).as_unit("ns").to_datetime64()
+        return value
+
+    def bounds(self):
+        """(minimum, maksimum) kolom, atau None jika semuanya kosong."""
+        if not len(self.sorted):
+            return None
+        return self.sorted[0], self.sorted[-1]
+
+    def between(self, lo=None, hi=None, rows=None, include_hi=True):
+        """
+        Posisi baris (terurut) dengan lo <= nilai <= hi (hi eksklusif jika
+        include_hi=False); None = tanpa batas. Bila kandidat `rows` lebih sedikit
+        daripada hasil rentang, nilai kandidat dicek langsung.
+        """
+        lo = None if lo is None else self.key(lo)
+        hi = None if hi is None else self.key(hi)
+        start = 0 if lo is None else np.searchsorted(self.sorted, lo, side="left")
+        stop = len(self.sorted) if hi is None else np.searchsorted(
+            self.sorted, hi, side="right" if include_hi else "left"
+        )
+        if rows is not None and len(rows) < stop - start:
+            values = self.values[rows]
+            keep = self.present[rows]
+            if lo is not None:
+                keep &= values >= lo
+            if hi is not None:
+                keep &= (values <= hi) if include_hi else (values < hi)
+            return rows[keep]
+        hits = np.sort(self.order[start:max(start, stop)])
+        if rows is None:
+            return hits
+        return np.intersect1d(rows, hits, assume_unique=True)
+
+    def top(self, n, rows=None, largest=True):
+        """Posisi baris (terurut) dari n nilai terbesar/terkecil, di semua baris atau di `rows`."""
+        if rows is None:
+            picks = self.order[max(0, len(self.order) - n):] if largest else self.order[:n]
+        else:
+            rows = rows[self.present[rows]]
+            ranked = rows[np.argsort(self.values[rows], kind="stable")]
+            picks = ranked[max(0, len(ranked) - n):] if largest else ranked[:n]
+        return np.sort(picks)
+
+
+# ======================
+# Indeks trigram untuk pencarian teks di semua kolom
+# ======================
+def text_searchable(series):
+    """Kolom teks: string/object, atau kategori dengan kategori teks."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    return pd.api.types.is_string_dtype(dtype) or pd.api.types.is_object_dtype(dtype)
+
+
+def _trigrams(texts):
+    """
+    Semua jendela 3 karakter dalam texts sebagai (kunci uint64, nomor teks).
+    Teks disambung menjadi satu larik code point (UTF-32); kunci = tiga code
+    point (21 bit masing-masing), jendela yang melewati batas teks dibuang.
+    """
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    points = np.frombuffer("".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    if len(points) < 3:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32)
+    points = points.astype(np.uint64)
+    owner = np.repeat(np.arange(len(texts), dtype=np.int32), lengths)
+    inside = owner[:-2] == owner[2:]
+    keys = (points[:-2] << np.uint64(42)) | (points[1:-1] << np.uint64(21)) | points[2:]
+    return keys[inside], owner[:-2][inside]
+
+
+class TextIndex:
+    """
+    Indeks trigram atas nilai unik kolom-kolom teks (bukan atas baris):
+    trigram → nomor nilai terurut (CSR). Query ≥ 3 karakter = irisan daftar
+    trigram-nya lalu verifikasi substring pada kandidat; query lebih pendek
+    memindai nilai unik. Nilai yang cocok dipetakan ke baris lewat indeks
+    terbalik kolomnya. Waktu bangun (termasuk indeks kolom yang belum ada)
+    dan ukurannya dicatat untuk ditampilkan.
+    """
+
+    def __init__(self, columns, column_index):
+        started = time.perf_counter()
+        self.columns = list(columns)
+        self.indexes = [column_index(name) for name in self.columns]
+        # 🔹 Nilai unik semua kolom disambung: nilai global ke-i milik kolom ke-searchsorted(bounds, i)
+        self.bounds = np.cumsum([0] + [len(index) for index in self.indexes])
+        texts = [index.keys() for index in self.indexes]
+        self.texts = pd.concat(texts, ignore_index=True) if texts else pd.Series([], dtype="str")
+        keys, owner = _trigrams(self.texts.tolist())
+        order = np.argsort(keys, kind="stable")
+        keys, owner = keys[order], owner[order]
+        # pasangan (trigram, nilai) ganda dalam satu teks cukup sekali
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1]) | (owner[1:] != owner[:-1])
+        keys, self.ids = keys[first], owner[first]
+        self.grams, starts = np.unique(keys, return_index=True)
+        self.offsets = np.append(starts, len(keys))
+        self.build_seconds = time.perf_counter() - started
+
+    def __len__(self):
+        return len(self.texts)
+
+    def nbytes(self):
+        return self.grams.nbytes + self.offsets.nbytes + self.ids.nbytes + int(self.texts.memory_usage(deep=True))
+
+    def value_ids(self, query):
+        """Nomor nilai unik (global, terurut) yang memuat `query`, tanpa beda huruf besar/kecil."""
+        query = str(query).strip().lower()
+        if len(query) < 3:
+            return np.flatnonzero(self.texts.str.contains(query, regex=False).to_numpy())
+        postings = []
+        for key in np.unique(_trigrams([query])[0]):
+            i = np.searchsorted(self.grams, key)
+            if i == len(self.grams) or self.grams[i] != key:
+                return self.ids[:0]
+            postings.append(self.ids[self.offsets[i]:self.offsets[i + 1]])
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        # trigram lengkap belum menjamin urutannya bersambung → cek substring
+        return candidates[self.texts.iloc[candidates].str.contains(query, regex=False).to_numpy()]
+
+    def rows(self, query):
+        """Posisi baris (terurut) yang salah satu kolom teksnya memuat `query`."""
+        ids = self.value_ids(query)
+        column = np.searchsorted(self.bounds, ids, side="right") - 1
+        parts = [
+            index.rows_of_codes(ids[column == i] - self.bounds[i])
+            for i, index in enumerate(self.indexes) if (column == i).any()
+        ]
+        if len(parts) == 1:
+            return parts[0]
+        # gabungan beberapa kolom lewat mask baris: O(n + k), tanpa mengurutkan ulang
+        hit = np.zeros(len(self.indexes[0].codes), dtype=bool)
+        for part in parts:
+            hit[part] = True
+        return np.flatnonzero(hit).astype(_row_dtype(len(hit)))
+
+
+class FilterIndex:
+    """
+    Indeks terbalik untuk semua kolom filter satu dataset. Indeks kolom dibuat
+    sekali saat kolom itu pertama kali difilter, lalu dipakai ulang di setiap
+    rerun (dan oleh semua sesi yang memakai dataset yang sama).
+    Hasil filter berupa posisi baris; None berarti semua baris.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._columns = {}
+        self._sorted = {}
+        self._text = {}
+        self._duplicates = {}
+        self._lock = threading.RLock()
+
+    def _build(self, indexes, name, make):
+        index = indexes.get(name)
+        if index is None:
+            with self._lock:
+                index = indexes.get(name)
+                if index is None:
+                    index = indexes[name] = make()
+        return index
+
+    def column(self, name):
+        return self._build(self._columns, name, lambda: ColumnIndex(self.df[name]))
+
+    def sorted_column(self, name):
+        return self._build(self._sorted, name, lambda: SortedIndex(self.df[name]))
+
+    def select(self, name, values, rows=None):
+        """
+        Menyempitkan `rows` ke baris dengan nilai kolom `name` di `values`.
+        Tanpa rows → langsung dari daftar posting; dengan rows → cek kode
+        hanya untuk baris kandidat, jadi biayanya sebanding jumlah baris lolos.
+        """
+        if not len(values):
+            return rows
+        index = self.column(name)
+        if rows is None:
+            return index.rows(values)
+        return index.matches(values, rows)
+
+    def catalog(self, name, rows=None):
+        return self.column(name).catalog(rows)
+
+    def search(self, name, query, rows=None, limit=100):
+        return self.column(name).search(query, rows, limit)
+
+    def text_index(self, columns):
+        """Indeks trigram untuk kolom-kolom teks `columns`, dibuat sekali per kombinasi kolom."""
+        columns = tuple(columns)
+        return self._build(self._text, columns, lambda: TextIndex(columns, self.column))
+
+    def search_text(self, query, columns, rows=None):
+        """Menyempitkan `rows` ke baris yang salah satu kolom `columns`-nya memuat `query`."""
+        if not str(query).strip():
+            return rows
+        hits = self.text_index(columns).rows(query)
+        if rows is None:
+            return hits
+        return np.intersect1d(rows, hits, assume_unique=True)
+
+    def duplicates(self, provenance, columns):
+        """Mask baris duplikat antar sumber (Provenance.duplicates), dihitung sekali per dataset."""
+        columns = tuple(columns)
+        return self._build(self._duplicates, columns, lambda: provenance.duplicates(self.df, list(columns)))
+
+    def between(self, name, lo=None, hi=None, rows=None, include_hi=True):
+        return self.sorted_column(name).between(lo, hi, rows, include_hi)
+
+    def top(self, name, n, rows=None, largest=True):
+        return self.sorted_column(name).top(n, rows, largest)
+
+    def nbytes(self):
+        """Memori semua indeks yang sudah dibangun, termasuk mask duplikat."""
+        indexes = list(self._columns.values()) + list(self._sorted.values()) + list(self._text.values())
+        masks = list(self._duplicates.values())
+        return sum(index.nbytes() for index in indexes) + sum(mask.nbytes for mask in masks)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+
+# ======================
+# Hasil filter sebagai tampilan (materialisasi terlambat)
+# ======================
+class FilteredView:
+    """
+    Hasil penyaringan tanpa salinan: DataFrame sumber, posisi baris yang lolos
+    (None = semua) dan kolom yang ditampilkan. Baris dan kolom baru diambil
+    saat dibutuhkan (tampilan, ekspor, agregasi grafik), hanya untuk kolom
+    yang dipakai konsumen tersebut.
+    """
+
+    def __init__(self, df, rows=None, columns=None):
+        self.df = df
+        self.rows = rows
+        self.columns = list(df.columns if not columns else columns)
+
+    def __len__(self):
+        return len(self.df) if self.rows is None else len(self.rows)
+
+    @property
+    def empty(self):
+        return not len(self) or not self.columns
+
+    def frame(self, columns=None):
+        """DataFrame baru berisi baris yang lolos untuk `columns` (default: kolom tampilan)."""
+        columns = list(self.columns if columns is None else columns)
+        if self.rows is None:
+            # salinan dangkal: kolom bisa diganti nama/ditimpa tanpa mengubah sumber
+            return self.df[columns].copy(deep=False)
+        return self.df.iloc[self.rows, self.df.columns.get_indexer(columns)]
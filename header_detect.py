@@ -0,0 +1,290 @@
+import datetime
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# ======================
+# Deteksi baris header
+# ======================
+_EMPTY_STRINGS = ["nan", "None", ""]
+
+# Jenis sel untuk sidik tata letak: kosong, teks, angka, tanggal/lainnya
+_EMPTY, _TEXT, _NUMBER, _OTHER = 0, 1, 2, 3
+
+
+def _cell_kind(value):
+    if value is None or value is pd.NA or value != value:
+        return _EMPTY
+    if isinstance(value, str):
+        if not value.strip():
+            return _EMPTY
+        try:
+            # Angka yang tersimpan sebagai teks (mis. CSV dibaca dtype=object)
+            float(value)
+            return _NUMBER
+        except ValueError:
+            return _TEXT
+    if isinstance(value, (bool, int, float, np.number)):
+        return _NUMBER
+    if isinstance(value, (datetime.date, datetime.time, np.datetime64)):
+        return _OTHER
+    return _TEXT
+
+
+_cell_kinds = np.frompyfunc(_cell_kind, 1, 1)
+
+
+def cell_kinds(raw_df):
+    """Matriks jenis sel (int8) untuk seluruh DataFrame dalam satu pass."""
+    with np.errstate(invalid="ignore"):
+        return _cell_kinds(raw_df.to_numpy(dtype=object)).astype(np.int8)
+
+
+def score_header_rows(raw_df):
+    """
+    Skor semua baris sekaligus: jumlah nilai unik per baris dikurangi jumlah sel
+    kosong ('nan', 'None', ''). Setara dengan pengecekan per baris memakai
+    astype(str) + set(), tetapi dihitung vektor untuk seluruh pratinjau.
+    """
+    strs = raw_df.to_numpy().astype(str)
+    if strs.shape[1] == 0:
+        return np.zeros(len(strs), dtype=np.int64)
+    codes = pd.factorize(strs.ravel())[0].reshape(strs.shape)
+    codes.sort(axis=1)
+    distinct = 1 + (np.diff(codes, axis=1) != 0).sum(axis=1)
+    return distinct - np.isin(strs, _EMPTY_STRINGS).sum(axis=1)
+
+
+def _header_band(kinds, best, max_header_rows):
+    """
+    Menentukan rentang header bertingkat di sekitar baris skor terbaik.
+    Baris teks (hanya teks, minimal dua sel) tepat di atas baris data terbaik
+    dipakai sebagai header; rentang diperluas ke atas/bawah selama baris
+    tetangganya teks dan punya sel kosong di dalam lebar tabel (bekas sel gabungan).
+    """
+    filled = kinds != _EMPTY
+    width = filled.any(axis=0).nonzero()[0]
+    width = width[-1] + 1 if len(width) else 0
+    texty = ((kinds == _TEXT) | ~filled).all(axis=1) & (filled.sum(axis=1) >= 2)
+    merged = texty & (~filled[:, :width]).any(axis=1)
+
+    if not texty[best] and best > 0 and texty[best - 1]:
+        # Baris data pertama sering menang skor unik; header-nya tepat di atas
+        best -= 1
+    first = last = best
+    while last - first + 1 < max_header_rows:
+        if first > 0 and merged[first - 1]:
+            first -= 1
+        elif last + 1 < len(kinds) and merged[last + 1]:
+            last += 1
+        else:
+            break
+    return best if first == last else tuple(range(first, last + 1))
+
+
+def detect_header_row(raw_df, max_preview=9, max_header_rows=1):
+    """
+    Mencari baris header pada sheet yang dibaca tanpa header (header=None).
+    Semua baris dalam max_preview baris pertama diberi skor sekaligus; baris
+    dengan nilai unik terbanyak (selain kosong) dianggap header.
+    Dengan max_header_rows > 1, header bertingkat dikembalikan sebagai tuple
+    indeks baris, mis. (2, 3). Sheet kosong → None.
+    """
+    preview = raw_df.iloc[:max_preview]
+    if not len(preview):
+        return None
+    scores = score_header_rows(preview)
+    best = int(np.argmax(scores))
+    if scores[best] < 0:
+        # Semua baris lebih banyak sel kosong daripada nilai unik
+        return None
+    if max_header_rows <= 1:
+        return best
+    return _header_band(cell_kinds(preview), best, max_header_rows)
+
+
+def header_rows(header_row):
+    """Indeks baris header sebagai tuple: 3 → (3,), (2, 3) → (2, 3), None → ()."""
+    if header_row is None:
+        return ()
+    if isinstance(header_row, (tuple, list)):
+        return tuple(header_row)
+    return (header_row,)
+
+
+def combine_header_rows(rows):
+    """
+    Menggabungkan beberapa baris header menjadi satu baris nama.
+    Baris atas diisi ke kanan (sel gabungan), lalu bagian tiap kolom disambung spasi.
+    Satu baris dikembalikan apa adanya.
+    """
+    if len(rows) == 1:
+        return list(rows[0])
+    width = max(len(row) for row in rows)
+    filled = []
+    for depth, row in enumerate(rows):
+        row = list(row) + [None] * (width - len(row))
+        if depth < len(rows) - 1:
+            last = None
+            for j, value in enumerate(row):
+                if _cell_kind(value) == _EMPTY:
+                    row[j] = last
+                else:
+                    last = value
+        filled.append(row)
+    names = []
+    for j in range(width):
+        parts = [str(row[j]).strip() for row in filled if _cell_kind(row[j]) != _EMPTY]
+        # Sel sama yang bertumpuk (gabungan vertikal) cukup ditulis sekali
+        parts = list(dict.fromkeys(parts))
+        names.append(" ".join(parts) if parts else None)
+    return names
+
+
+# ======================
+# Deteksi dengan cache template
+# ======================
+class HeaderDetector:
+    """
+    Pengaturan deteksi header (kedalaman pindai, jumlah baris header maksimum)
+    dengan cache template: sheet yang tata letak sel terisinya pada scan_depth
+    baris pertama sama (dibuat dari template yang sama) memakai ulang hasil
+    deteksi sebelumnya tanpa menghitung jenis sel dan skor baris.
+    Detector disimpan per sesi; salinan di proses pekerja mengembalikan template
+    barunya lewat learned() untuk digabung dengan merge(). Cache dijaga lock
+    karena detector yang sama dipakai job parsing latar belakang.
+    """
+
+    max_templates = 4096
+
+    def __init__(self, scan_depth=9, max_header_rows=1):
+        self.scan_depth = scan_depth
+        self.max_header_rows = max_header_rows
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+        self._inherited = frozenset()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"HeaderDetector(scan_depth={self.scan_depth}, max_header_rows={self.max_header_rows})"
+
+    def __getstate__(self):
+        # Lock tidak bisa di-pickle (detector dikirim ke proses pekerja)
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        # Salinan di proses pekerja: hitungan dan template baru dilaporkan lewat learned()
+        self.hits = self.misses = 0
+        self._inherited = frozenset(self._templates)
+
+    def fingerprint(self, raw_df):
+        """
+        Sidik tata letak murah: ukuran pratinjau dan pola sel terisi (bit per sel),
+        tanpa memeriksa nilai sel satu per satu.
+        """
+        filled = raw_df.iloc[:self.scan_depth].notna().to_numpy()
+        return (self.scan_depth, self.max_header_rows, filled.shape, np.packbits(filled).tobytes())
+
+    def detect(self, raw_df):
+        """Seperti detect_header_row, tetapi memakai ulang hasil untuk template yang sama."""
+        preview = raw_df.iloc[:self.scan_depth]
+        if not len(preview):
+            return None
+        key = self.fingerprint(preview)
+        with self._lock:
+            if key in self._templates:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return self._templates[key]
+            self.misses += 1
+        header_row = detect_header_row(preview, self.scan_depth, self.max_header_rows)
+        self.merge({key: header_row})
+        return header_row
+
+    def learned(self):
+        """(template baru sejak disalin ke proses ini, hits, misses) untuk merge() di proses utama."""
+        with self._lock:
+            templates = {k: v for k, v in self._templates.items() if k not in self._inherited}
+            return templates, self.hits, self.misses
+
+    def merge(self, templates, hits=0, misses=0):
+        """Menambahkan template (dan hitungan) hasil detector lain ke cache ini."""
+        with self._lock:
+            self._templates.update(templates)
+            for key in templates:
+                self._templates.move_to_end(key)
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+            self.hits += hits
+            self.misses += misses
+
+
+# ======================
+# Promosi baris header di memori
+# ======================
+def _header_name(value, position):
+    if pd.isna(value) or str(value).strip() == "":
+        return f"Unnamed: {position}"
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _dedupe_columns(names):
+    """Menamai ulang kolom ganda seperti pandas: Nama, Nama.1, Nama.2, ..."""
+    seen = {}
+    result = []
+    for name in names:
+        if name in seen:
+            seen[name] += 1
+            new_name = f"{name}.{seen[name]}"
+            while new_name in seen:
+                seen[name] += 1
+                new_name = f"{name}.{seen[name]}"
+            seen[new_name] = 0
+            result.append(new_name)
+        else:
+            seen[name] = 0
+            result.append(name)
+    return result
+
+
+def header_names(values):
+    """Mengubah nilai baris header menjadi nama kolom yang unik."""
+    return _dedupe_columns([_header_name(v, i) for i, v in enumerate(values)])
+
+
+def restore_int_columns(df):
+    """Mengembalikan kolom float yang isinya bilangan bulat penuh menjadi int64."""
+    for col in df.columns[df.dtypes == "float64"]:
+        values = df[col]
+        if len(values) and values.notna().all() and (values % 1 == 0).all():
+            df[col] = values.astype("int64")
+    return df
+
+
+def promote_header(raw_df, header_row):
+    """
+    Menjadikan baris `header_row` dari sheet mentah sebagai nama kolom,
+    setara dengan pd.read_excel(..., header=header_row) tanpa membaca file lagi.
+    header_row berupa tuple → header bertingkat digabung jadi satu nama per kolom.
+    header_row=None → tanpa header (kolom 0, 1, 2, ...).
+    """
+    if header_row is None:
+        return raw_df.copy()
+
+    rows = header_rows(header_row)
+    df = raw_df.iloc[rows[-1] + 1:].reset_index(drop=True)
+    df.columns = header_names(combine_header_rows([raw_df.iloc[r].tolist() for r in rows]))
+    df = df.infer_objects()
+
+    # Bilangan bulat yang terbaca float karena baris judul/kosong di atasnya
+    return restore_int_columns(df)
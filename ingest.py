@@ -0,0 +1,486 @@
+import csv
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from header_detect import HeaderDetector, combine_header_rows, header_names, header_rows
+from readers import (
+    csv_shape_estimate,
+    ods_sheet_info,
+    read_csv_chunked,
+    read_csv_columns,
+    read_ods_columns,
+    read_ods_streaming,
+    read_xlsx_columns,
+    read_xlsx_streaming,
+    xlsx_sheet_info,
+)
+
+
+# ======================
+# Deteksi format dari isi file (magic bytes)
+# ======================
+_ZIP_MAGIC = b"PK\x03\x04"
+_OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_ODS_MIMETYPE = b"application/vnd.oasis.opendocument.spreadsheet"
+
+
+def _peek(source, size):
+    """Membaca `size` byte pertama tanpa menggeser posisi file."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(size)
+    pos = source.tell()
+    source.seek(0)
+    head = source.read(size)
+    source.seek(pos)
+    return head
+
+
+def _looks_like_csv(head):
+    if not head or b"\x00" in head:
+        return False
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            sample = head.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        return False
+    # Potongan terakhir mungkin terpotong di tengah baris
+    lines = sample.splitlines()[:50]
+    if len(lines) > 1:
+        lines = lines[:-1]
+    try:
+        csv.Sniffer().sniff("\n".join(lines), delimiters=",;\t|")
+        return True
+    except csv.Error:
+        return len(lines) >= 1 and all(line.isprintable() for line in lines)
+
+
+def detect_format(source):
+    """
+    Mendeteksi format file dari isinya: "xlsx", "ods", "xls", "csv", atau "unknown".
+    Zip dibedakan lewat entri `mimetype` (ODS) dan `[Content_Types].xml` (XLSX),
+    teks dicek dengan csv.Sniffer pada potongan awal file.
+    """
+    head = _peek(source, 64 * 1024)
+    if head.startswith(_ZIP_MAGIC):
+        try:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            with zipfile.ZipFile(source) as zf:
+                names = set(zf.namelist())
+                if "mimetype" in names and zf.read("mimetype").startswith(_ODS_MIMETYPE):
+                    return "ods"
+                if "[Content_Types].xml" in names and b"spreadsheetml" in zf.read("[Content_Types].xml"):
+                    return "xlsx"
+                if "xl/workbook.xml" in names:
+                    return "xlsx"
+        except zipfile.BadZipFile:
+            pass
+        finally:
+            if hasattr(source, "seek"):
+                source.seek(0)
+        return "unknown"
+    if head.startswith(_OLE2_MAGIC):
+        return "xls"
+    if _looks_like_csv(head):
+        return "csv"
+    return "unknown"
+
+
+# ======================
+# File duplikat (isi byte sama)
+# ======================
+def split_duplicates(items, digests):
+    """
+    Memisahkan item yang isinya sama persis dengan item sebelumnya (hash sama).
+    Mengembalikan (item unik, [(item duplikat, item pertama dengan isi sama), ...]).
+    """
+    first = {}
+    unique, duplicates = [], []
+    for item, digest in zip(items, digests):
+        if digest in first:
+            duplicates.append((item, first[digest]))
+        else:
+            first[digest] = item
+            unique.append(item)
+    return unique, duplicates
+
+
+# ======================
+# Parsing satu file (tanpa Streamlit, aman dipanggil di proses lain)
+# ======================
+def parse_file(source, file_name, header_row=None, sheet_names=None, fmt=None, csv_memory_limit_mb=None,
+               usecols=None, detector=None, chunk_rows=None):
+    """
+    Membaca file Excel/ODS/CSV menjadi dict {nama_sheet: DataFrame}.
+    Pembaca dipilih dari format hasil detect_format (bukan dari ekstensi),
+    sehingga file yang salah nama langsung dibaca dengan pembaca yang benar.
+    CSV dibaca per chunk dengan batas memori csv_memory_limit_mb.
+    usecols (nama kolom) diteruskan ke pembaca XLSX/ODS/CSV jika header diketahui
+    saat membaca; XLS dan mode mentah tetap membaca semua kolom.
+    detector (HeaderDetector) mengatur deteksi header untuk header_row="auto".
+    chunk_rows = baris per chunk pembaca (None = bawaan pembaca); lihat estimate_sheets.
+    """
+    fmt = fmt or detect_format(source)
+    chunk = {"chunk_rows": chunk_rows} if chunk_rows else {}
+    if fmt == "xlsx":
+        return read_xlsx_streaming(source, sheet_names, header_row, detector, usecols=usecols, **chunk)
+    if fmt == "ods":
+        return read_ods_streaming(source, sheet_names, header_row, detector, usecols=usecols, **chunk)
+
+    if fmt == "csv":
+        return {"Sheet1": read_csv_chunked(source, header_row, detector, memory_limit_mb=csv_memory_limit_mb,
+                                           usecols=usecols, **chunk)}
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if fmt == "xls":
+        return pd.read_excel(source, sheet_name=sheet_names or None, header=None)
+    raise ValueError(f"Format file {file_name} tidak dikenali")
+
+
+def read_columns(source, header_row="auto", sheet_names=None, fmt=None, detector=None):
+    """
+    Baca header saja: {nama_sheet: [nama kolom]} dari scan_depth baris pertama
+    tiap sheet, tanpa mendekode isi data.
+    """
+    detector = detector or HeaderDetector()
+    fmt = fmt or detect_format(source)
+    if fmt == "xlsx":
+        return read_xlsx_columns(source, sheet_names, header_row, detector)
+    if fmt == "ods":
+        return read_ods_columns(source, sheet_names, header_row, detector)
+    if fmt == "csv":
+        return {"Sheet1": read_csv_columns(source, header_row, detector)}
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if fmt == "xls":
+        previews = pd.read_excel(source, sheet_name=sheet_names or None, header=None, nrows=detector.scan_depth)
+        columns = {}
+        for name, preview in previews.items():
+            row = detector.detect(preview) if header_row == "auto" else header_row
+            if row is None or preview.empty:
+                columns[name] = []
+            else:
+                rows = [preview.iloc[min(r, len(preview) - 1)].tolist() for r in header_rows(row)]
+                columns[name] = header_names(combine_header_rows(rows))
+        return columns
+    raise ValueError("Format file tidak dikenali")
+
+
+# ======================
+# Handle workbook malas (sheet di-parse saat dipilih)
+# ======================
+class LazyWorkbook:
+    """
+    Handle workbook yang hanya membaca metadata: nama sheet dan dimensinya
+    diambil dari workbook.xml / <dimension ref> (XLSX) atau dari atribut baris
+    dan sel content.xml (ODS; semua elemen sel dilalui, nilainya tidak dikonversi).
+    Sel baru di-parse (lewat IngestJob) untuk sheet yang dipilih.
+    """
+
+    def __init__(self, source, fmt=None, sheets=None):
+        self.source = source
+        self.fmt = fmt or detect_format(source)
+        if sheets is not None:
+            self.sheets = sheets
+        elif self.fmt == "xlsx":
+            self.sheets = xlsx_sheet_info(source)
+        elif self.fmt == "ods":
+            self.sheets = ods_sheet_info(source)
+        elif self.fmt == "xls":
+            self.sheets = [{"name": n, "rows": None, "cols": None} for n in pd.ExcelFile(source).sheet_names]
+        else:
+            self.sheets = [{"name": "Sheet1", "rows": None, "cols": None}]
+
+    @property
+    def sheet_names(self):
+        return [s["name"] for s in self.sheets]
+
+    def non_empty_sheets(self):
+        """Sheet yang menurut metadata berisi lebih dari satu sel (atau belum diketahui)."""
+        return [
+            s["name"] for s in self.sheets
+            if s["rows"] is None or s["rows"] > 1 or (s["cols"] or 0) > 1
+        ]
+
+    def estimate(self, in_memory_max_bytes=None):
+        """Perkiraan ukuran tiap sheet dari metadata (lihat estimate_sheets)."""
+        return estimate_sheets(self.source, self.fmt, self.sheets, in_memory_max_bytes)
+
+
+# ======================
+# Preflight: perkiraan ukuran sheet tanpa parsing
+# ======================
+_CELL_BYTES = 8             # angka/tanggal per sel setelah di-parse
+_TEXT_CELL_BYTES = 16       # sel ODS (teks tidak terpisah seperti sharedStrings XLSX)
+_XML_BYTES_PER_CELL = 40    # rata-rata XML per sel jika <dimension> tidak ada
+IN_MEMORY_MAX_BYTES = 64 * 2**20
+_MIN_CHUNK_ROWS = 50_000    # batas bawah chunk CSV di memori; perkiraan baris bisa terlalu kecil
+
+
+def _file_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    return len(source.getvalue()) if hasattr(source, "getvalue") else None
+
+
+def estimate_sheets(source, fmt, sheets=None, in_memory_max_bytes=None):
+    """
+    Perkiraan baris, kolom, dan memori tiap sheet hanya dari metadata:
+    XLSX dari <dimension ref>, ukuran XML sheet dan sharedStrings.xml;
+    ODS dari jumlah baris/kolom (termasuk number-rows-repeated); CSV dari
+    panjang baris rata-rata di awal file. Sel tidak didekode.
+    CSV yang diperkirakan muat di bawah in_memory_max_bytes dibaca di memori
+    dalam satu chunk (parser C pandas langsung menghasilkan kolom bertipe);
+    sheet XLSX/ODS selalu streaming per chunk berukuran bawaan pembaca, karena
+    satu chunk besar di sana berarti objek Python per sel untuk seluruh sheet.
+    Mengembalikan {nama_sheet: {"rows", "cols", "bytes", "path", "chunk_rows"}}.
+    """
+    in_memory_max_bytes = in_memory_max_bytes or IN_MEMORY_MAX_BYTES
+    if fmt == "csv":
+        rows, cols, size = csv_shape_estimate(source)
+        sheets = [{"name": "Sheet1", "rows": rows, "cols": cols}]
+        text_bytes = {"Sheet1": size // 2}
+    else:
+        if sheets is None:
+            sheets = xlsx_sheet_info(source) if fmt == "xlsx" else ods_sheet_info(source) if fmt == "ods" else []
+        total_xml = sum(s.get("xml_bytes") or 0 for s in sheets) or 1
+        text_bytes = {
+            s["name"]: (s.get("strings_bytes") or 0) * (s.get("xml_bytes") or 0) // total_xml for s in sheets
+        }
+
+    estimates = {}
+    for s in sheets:
+        rows, cols = s.get("rows"), s.get("cols")
+        if rows is not None and cols is not None:
+            cells = rows * cols
+        elif s.get("xml_bytes"):
+            cells = s["xml_bytes"] // _XML_BYTES_PER_CELL
+        else:
+            cells = None
+        if cells is None:
+            # XLS (BIFF) tanpa metadata dimensi → perkiraan kasar dari ukuran file
+            size = _file_size(source)
+            nbytes = size * 4 // max(1, len(sheets)) if size else None
+        elif fmt == "ods":
+            nbytes = cells * _TEXT_CELL_BYTES
+        else:
+            nbytes = cells * _CELL_BYTES + text_bytes.get(s["name"], 0)
+        in_memory = fmt == "csv" and nbytes is not None and nbytes <= in_memory_max_bytes and rows is not None
+        estimates[s["name"]] = {
+            "rows": rows, "cols": cols, "bytes": nbytes,
+            "path": "memori" if in_memory else "streaming",
+            "chunk_rows": max(rows + 1, _MIN_CHUNK_ROWS) if in_memory else None,
+        }
+    return estimates
+
+
+def available_memory():
+    """Memori fisik yang masih tersedia (byte) dari /proc/meminfo atau sysconf; None jika tidak diketahui."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def sheet_plan(path, fmt, split_sheets_bytes):
+    """Workbook XLSX besar dipecah per sheet; file lain dibaca utuh."""
+    if fmt == "xlsx" and os.path.getsize(path) >= split_sheets_bytes:
+        names = [s["name"] for s in xlsx_sheet_info(path)]
+        if len(names) > 1:
+            return [[n] for n in names]
+    return [None]
+
+
+def _parse_task(path, file_name, sheet_names, header_row, fmt, csv_memory_limit_mb, usecols, detector,
+                chunk_rows=None):
+    return parse_file(path, file_name, header_row, sheet_names, fmt, csv_memory_limit_mb, usecols, detector,
+                      chunk_rows)
+
+
+# Template header yang dipelajari task sebelumnya di proses pekerja ini
+_worker_templates = {}
+
+
+def _parse_task_in_worker(*args):
+    """
+    _parse_task di proses pekerja: detector salinan diberi template dari task
+    sebelumnya di proses yang sama, lalu template barunya dan hitungan hit/miss
+    dikembalikan bersama hasil untuk digabung ke detector proses utama.
+    """
+    detector = args[7]
+    if detector is None:
+        return _parse_task(*args), None
+    detector.merge(_worker_templates)
+    sheets = _parse_task(*args)
+    learned = detector.learned()
+    _worker_templates.update(learned[0])
+    return sheets, learned
+
+
+# ======================
+# Parsing di latar belakang (progres, pembatalan, hasil parsial)
+# ======================
+class IngestJob:
+    """
+    Mem-parse daftar task di thread latar belakang agar skrip Streamlit tidak
+    terblokir. Satu task = (kunci, grup, source, nama_file, sheet_names, format, chunk_rows);
+    grup mengikat task milik file yang sama (mis. satu task per sheet), chunk_rows
+    memilih jalur baca di memori atau streaming (lihat estimate_sheets).
+    Status tiap task dan hasil yang sudah selesai bisa dibaca kapan saja,
+    cancel() menghentikan job setelah task yang sedang berjalan.
+    max_workers > 1 memakai process pool (source harus berupa path).
+    """
+
+    WAITING, RUNNING, DONE, FAILED, CANCELLED = "menunggu", "membaca", "selesai", "gagal", "dibatalkan"
+
+    def __init__(self, tasks, header_row=None, csv_memory_limit_mb=None, usecols=None, detector=None,
+                 max_workers=1):
+        self.tasks = [self._own_source(task) for task in tasks]
+        self.keys = frozenset(task[0] for task in self.tasks)
+        self.groups = frozenset(task[1] for task in self.tasks)
+        self.header_row = header_row
+        self.csv_memory_limit_mb = csv_memory_limit_mb
+        self.usecols = usecols
+        self.detector = detector
+        self.max_workers = max_workers
+        self.status = [self.WAITING] * len(self.tasks)
+        self.results = {}
+        self._taken = set()
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _own_source(task):
+        # Upload di memori diberi BytesIO sendiri (berbagi bytes, tanpa salinan)
+        # agar posisi baca tidak bentrok dengan skrip yang memakai objek aslinya
+        key, group, source, *rest = task
+        if hasattr(source, "getvalue"):
+            source = io.BytesIO(source.getvalue())
+        return key, group, source, *rest
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def progress(self):
+        """(jumlah task selesai/gagal, jumlah task)."""
+        return len(self.results), len(self.tasks)
+
+    def _finish(self, i, sheets, error):
+        with self._lock:
+            self.results[self.tasks[i][0]] = (sheets, error)
+            self.status[i] = self.FAILED if error is not None else self.DONE
+
+    def _task_args(self, i):
+        _, _, source, file_name, sheet_names, fmt, chunk_rows = self.tasks[i]
+        return (source, file_name, sheet_names, self.header_row, fmt, self.csv_memory_limit_mb, self.usecols,
+                self.detector, chunk_rows)
+
+    def _run(self):
+        if self.max_workers == 1 or len(self.tasks) <= 1:
+            for i in range(len(self.tasks)):
+                if self._cancel.is_set():
+                    break
+                self.status[i] = self.RUNNING
+                try:
+                    self._finish(i, _parse_task(*self._task_args(i)), None)
+                except Exception as e:
+                    self._finish(i, None, e)
+        else:
+            # Server Streamlit multi-thread: fork dari thread ini bisa deadlock → forkserver
+            pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("forkserver")
+            )
+            futures = {pool.submit(_parse_task_in_worker, *self._task_args(i)): i for i in range(len(self.tasks))}
+            # Task di pool tidak bisa dilacak satu per satu → semuanya dianggap sedang dibaca
+            self.status = [self.RUNNING] * len(self.tasks)
+            pending = set(futures)
+            while pending and not self._cancel.is_set():
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        sheets, learned = future.result()
+                    except Exception as e:
+                        self._finish(futures[future], None, e)
+                        continue
+                    if learned is not None:
+                        self.detector.merge(*learned)
+                    self._finish(futures[future], sheets, None)
+            pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for i, status in enumerate(self.status):
+                if status in (self.WAITING, self.RUNNING):
+                    self.status[i] = self.CANCELLED
+
+    def has_new(self):
+        """Ada task selesai yang belum diambil lewat take()."""
+        return len(self.results) > len(self._taken)
+
+    def take(self):
+        """Hasil yang baru selesai sejak panggilan sebelumnya: [(kunci, sheets, error), ...]."""
+        with self._lock:
+            new = [(key, *result) for key, result in self.results.items() if key not in self._taken]
+            self._taken.update(key for key, *_ in new)
+        return new
+
+    def sheets(self, key):
+        """Sheet hasil task `key` yang selesai tanpa error, atau None (belum selesai/gagal)."""
+        with self._lock:
+            result = self.results.get(key)
+        return result[0] if result is not None and result[1] is None else None
+
+    def errors(self, group=None):
+        """[(kunci, error), ...] task yang gagal, opsional hanya untuk satu grup."""
+        with self._lock:
+            return [
+                (key, self.results[key][1]) for key, task_group, *_ in self.tasks
+                if key in self.results and self.results[key][1] is not None and group in (None, task_group)
+            ]
+
+    def group_result(self, group):
+        """
+        Hasil satu grup (file) jika semua task-nya sudah selesai:
+        (sheets digabung sesuai urutan task, error pertama atau None); selain itu None.
+        """
+        sheets, error = {}, None
+        with self._lock:
+            for key, task_group, *_ in self.tasks:
+                if task_group != group:
+                    continue
+                if key not in self.results:
+                    return None
+                task_sheets, task_error = self.results[key]
+                error = error or task_error
+                sheets.update(task_sheets or {})
+        return (None if error else sheets), error
@@ -0,0 +1,339 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    CategoricalDtype,
+    DatetimeTZDtype,
+    is_bool_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    union_categoricals,
+)
+
+
+# ======================
+# Penentuan skema gabungan
+# ======================
+def _family(dtype):
+    """Kelompok dtype untuk mendeteksi konflik antar sumber."""
+    if is_bool_dtype(dtype):
+        return "bool"
+    if is_integer_dtype(dtype) or is_float_dtype(dtype):
+        return "numeric"
+    if isinstance(dtype, DatetimeTZDtype) or (isinstance(dtype, np.dtype) and dtype.kind == "M"):
+        return "datetime"
+    if isinstance(dtype, np.dtype) and dtype.kind == "m":
+        return "timedelta"
+    if isinstance(dtype, (CategoricalDtype, pd.StringDtype)) or dtype == object:
+        return "text"
+    return str(dtype)
+
+
+def _numpy_dtype(dtype):
+    """dtype numpy padanan (Int64 → int64, boolean → bool)."""
+    return dtype.numpy_dtype if hasattr(dtype, "numpy_dtype") else dtype
+
+
+def target_dtype(dtypes, has_missing):
+    """
+    dtype kolom hasil gabungan dari dtype tiap sumber.
+    Bilangan bulat tetap bulat (Int64 nullable jika ada sumber tanpa kolom ini),
+    campuran bulat/desimal → float64, tanggal memakai satuan terhalus,
+    kategori/str dipertahankan, sisanya object.
+    """
+    unique = list(dict.fromkeys(dtypes))
+    if len(unique) == 1 and not has_missing:
+        return unique[0]
+    families = {_family(d) for d in unique}
+    if families == {"bool"}:
+        return pd.BooleanDtype() if has_missing or any(d != bool for d in unique) else np.dtype(bool)
+    if families == {"numeric"}:
+        resolved = np.result_type(*[_numpy_dtype(d) for d in unique])
+        if resolved.kind in "iu":
+            nullable = has_missing or any(not isinstance(d, np.dtype) for d in unique)
+            return pd.Int64Dtype() if nullable else resolved
+        return np.dtype("float64")
+    if families <= {"datetime", "timedelta"} and len(families) == 1:
+        if any(isinstance(d, DatetimeTZDtype) for d in unique):
+            # zona waktu tetap hanya jika semua sumber memakai zona yang sama
+            return unique[0] if len(unique) == 1 else np.dtype(object)
+        return np.result_type(*unique)
+    if all(isinstance(d, CategoricalDtype) for d in unique) and len({d.categories.dtype for d in unique}) == 1:
+        return unique[0]
+    if len(unique) == 1 and isinstance(unique[0], pd.StringDtype):
+        return unique[0]
+    return np.dtype(object)
+
+
+def merge_schema(frames, sources=None):
+    """
+    Menghitung skema gabungan tanpa menyalin data.
+    Mengembalikan (kolom berurutan, {kolom: dtype target}, laporan), dengan laporan
+    {"missing": {sumber: [kolom]}, "conflicts": {kolom: {sumber: dtype}}}.
+    """
+    sources = list(sources) if sources is not None else list(range(len(frames)))
+    columns = list(dict.fromkeys(col for df in frames for col in df.columns))
+    present = {col: [] for col in columns}
+    for source, df in zip(sources, frames):
+        for col, dtype in df.dtypes.items():
+            present[col].append((source, dtype, len(df)))
+
+    dtypes = {}
+    conflicts = {}
+    for col in columns:
+        # 🔹 Sheet tanpa baris (mis. template berisi header saja) terbaca float64/object;
+        # dtype-nya tidak ikut menentukan tipe kolom maupun konflik
+        seen = [(source, d) for source, d, rows in present[col] if rows] or [
+            (source, d) for source, d, _ in present[col]
+        ]
+        has_missing = len(seen) < len(frames) and any(len(df) for df in frames if col not in df.columns)
+        dtypes[col] = target_dtype([d for _, d in seen], has_missing)
+        if len({_family(d) for _, d in seen}) > 1:
+            conflicts[col] = {source: str(d) for source, d in seen}
+
+    missing = {}
+    for source, df in zip(sources, frames):
+        absent = [col for col in columns if col not in df.columns]
+        if absent and len(df):
+            missing[source] = absent
+    return columns, dtypes, {"missing": missing, "conflicts": conflicts}
+
+
+# ======================
+# Penggabungan satu kali alokasi
+# ======================
+def _fill_numpy(col, dtype, frames, bounds, total):
+    """Kolom numpy dialokasikan sekali, lalu tiap sumber disalin ke potongannya."""
+    if isinstance(dtype, (pd.Int64Dtype, pd.BooleanDtype)):
+        values = np.zeros(total, dtype=dtype.numpy_dtype)
+        mask = np.ones(total, dtype=bool)
+        for df, (start, stop) in zip(frames, bounds):
+            if col in df.columns and stop > start:
+                series = df[col]
+                if isinstance(series.dtype, np.dtype):
+                    # int64/bool numpy tidak punya nilai kosong
+                    values[start:stop] = series.to_numpy()
+                    mask[start:stop] = False
+                else:
+                    values[start:stop] = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+                    mask[start:stop] = series.isna().to_numpy()
+        array_type = pd.arrays.IntegerArray if isinstance(dtype, pd.Int64Dtype) else pd.arrays.BooleanArray
+        return array_type(values, mask)
+
+    if dtype.kind in "Mm":
+        out = np.full(total, np.datetime64("NaT") if dtype.kind == "M" else np.timedelta64("NaT"), dtype=dtype)
+    elif dtype.kind in "fc" or dtype == object:
+        out = np.full(total, np.nan, dtype=dtype)
+    else:
+        out = np.empty(total, dtype=dtype)
+    for df, (start, stop) in zip(frames, bounds):
+        if col in df.columns and stop > start:
+            series = df[col]
+            if dtype.kind in "fc":
+                out[start:stop] = series.to_numpy(dtype=dtype, na_value=np.nan)
+            else:
+                out[start:stop] = series.to_numpy(dtype=dtype)
+    return out
+
+
+def _fill_extension(col, dtype, frames, bounds):
+    """Kolom kategori/str/tz disambung per potongan (sumber tanpa kolom → NA)."""
+    is_category = isinstance(dtype, CategoricalDtype)
+    pieces = []
+    for df, (start, stop) in zip(frames, bounds):
+        if stop == start:
+            # sumber tanpa baris bisa ber-dtype lain; tidak ada yang perlu disambung
+            continue
+        if col in df.columns:
+            pieces.append(df[col].array)
+        elif stop > start and is_category:
+            pieces.append(pd.Categorical.from_codes(np.full(stop - start, -1), dtype=dtype))
+        elif stop > start:
+            pieces.append(pd.array(np.full(stop - start, np.nan), dtype=dtype))
+    if not pieces:
+        return pd.array([], dtype=dtype)
+    if is_category:
+        return union_categoricals(pieces, ignore_order=True)
+    return pd.concat([pd.Series(p, copy=False) for p in pieces], ignore_index=True).array
+
+
+def merge_frames(frames, sources=None):
+    """
+    Menggabungkan DataFrame secara vertikal seperti pd.concat(ignore_index=True),
+    tetapi skema gabungan dan dtype target dihitung dulu, lalu tiap kolom
+    dialokasikan satu kali dan diisi per potongan sumber. Tidak ada salinan
+    antara per sumber yang di-reindex/upcast, dan kolom bulat tidak berubah
+    jadi float hanya karena ada sumber tanpa kolom itu (dipakai Int64).
+    Mengembalikan (DataFrame, laporan) — lihat merge_schema.
+    """
+    columns, dtypes, report = merge_schema(frames, sources)
+    bounds = []
+    total = 0
+    for df in frames:
+        bounds.append((total, total + len(df)))
+        total += len(df)
+
+    data = {}
+    for col in columns:
+        dtype = dtypes[col]
+        if isinstance(dtype, (pd.Int64Dtype, pd.BooleanDtype)) or isinstance(dtype, np.dtype):
+            data[col] = _fill_numpy(col, dtype, frames, bounds, total)
+        else:
+            data[col] = _fill_extension(col, dtype, frames, bounds)
+    merged = pd.DataFrame(data, index=pd.RangeIndex(total), columns=columns, copy=False)
+    report["dtypes"] = {col: str(dtype) for col, dtype in merged.dtypes.items()}
+    return merged, report
+
+
+# ======================
+# Asal baris (provenance) terkode rentang
+# ======================
+def _code_dtype(n):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class Provenance:
+    """
+    Asal tiap baris data gabungan tanpa string per baris: tabel sumber kecil
+    (satu baris per sheet: __FILE__, __SHEET__) plus batas baris tiap sumber.
+    Kolom __FILE__/__SHEET__ dibentuk saat dibutuhkan sebagai Categorical
+    dari kode integer (1–2 byte per baris).
+    """
+
+    COLUMNS = ("__FILE__", "__SHEET__")
+
+    def __init__(self, origins, lengths):
+        files, sheets = zip(*origins) if origins else ((), ())
+        self.sources = pd.DataFrame({"__FILE__": list(files), "__SHEET__": list(sheets)})
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)])
+
+    @classmethod
+    def from_frames(cls, frames, origins):
+        return cls(origins, [len(df) for df in frames])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def source_codes(self, rows=None):
+        """Indeks sumber per baris; rows = posisi baris di data gabungan (None = semua)."""
+        dtype = _code_dtype(len(self.sources))
+        if rows is None:
+            return np.repeat(np.arange(len(self.sources), dtype=dtype), self.lengths)
+        return (np.searchsorted(self.offsets, rows, side="right") - 1).astype(dtype)
+
+    def column(self, name, rows=None):
+        """Kolom virtual __FILE__ atau __SHEET__ sebagai Categorical."""
+        codes, categories = pd.factorize(self.sources[name])
+        codes = codes.astype(_code_dtype(len(categories)))
+        return pd.Categorical.from_codes(codes[self.source_codes(rows)], categories=categories)
+
+    def attach(self, df):
+        """
+        Menambahkan kolom virtual ke df. Indeks df dipakai sebagai posisi baris
+        di data gabungan, jadi hasil filter pun mendapat asal yang benar.
+        """
+        rows = None if len(df) == len(self) and isinstance(df.index, pd.RangeIndex) else df.index.to_numpy()
+        df = df.copy(deep=False)
+        for name in self.COLUMNS:
+            df[name] = pd.Series(self.column(name, rows), index=df.index, copy=False)
+        return df
+
+    def duplicates(self, df, columns=None):
+        """
+        Mask baris df (urutan data gabungan) yang isinya sama persis dengan
+        baris sebelumnya dari sumber lain; duplikat di dalam satu sheet diabaikan.
+        """
+        first = first_occurrence(df, columns)
+        return (first != np.arange(len(first))) & (self.source_codes(first) != self.source_codes())
+
+    def label(self, source):
+        """Label 'file / sheet' untuk sumber ke-i."""
+        return " / ".join(map(str, self.sources.iloc[source]))
+
+    def rows_of(self, source):
+        """Rentang baris (awal, akhir) milik sumber ke-i."""
+        return int(self.offsets[source]), int(self.offsets[source + 1])
+
+
+# ======================
+# Deteksi baris duplikat (hash baris vektor)
+# ======================
+def row_hashes(df, columns=None):
+    """Hash uint64 isi tiap baris (tanpa indeks), dihitung vektor per kolom."""
+    if columns is not None:
+        df = df[list(columns)]
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def first_occurrence(df, columns=None):
+    """
+    Posisi baris pertama yang isinya sama untuk setiap baris (berdasarkan hash).
+    Baris i duplikat jika hasil[i] != i.
+    """
+    hashes = row_hashes(df, columns)
+    _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    return first[inverse.ravel()]
+
+
+# ======================
+# Pemadatan dtype setelah digabung
+# ======================
+_NULLABLE_INTS = [pd.Int8Dtype(), pd.Int16Dtype(), pd.Int32Dtype(), pd.Int64Dtype()]
+
+
+def _compact_column(series, category_ratio):
+    """dtype yang lebih hemat untuk satu kolom tanpa kehilangan nilai, atau None."""
+    dtype = series.dtype
+    if isinstance(dtype, CategoricalDtype) or is_bool_dtype(dtype):
+        return None
+    if isinstance(dtype, pd.StringDtype) or dtype == object:
+        values = series.dropna()
+        if dtype == object and not values.map(type).eq(str).all():
+            return None  # objek campuran (angka + teks, tanggal, ...) dibiarkan
+        if len(values) and values.nunique() <= category_ratio * len(values):
+            return "category"
+        return "str" if dtype == object else None
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and is_integer_dtype(dtype):
+        values = series.dropna()
+        if not len(values):
+            return None
+        lo, hi = values.min(), values.max()
+        for candidate in _NULLABLE_INTS:
+            info = np.iinfo(candidate.numpy_dtype)
+            if info.min <= lo and hi <= info.max:
+                return candidate if candidate != dtype else None
+        return None
+    if is_integer_dtype(dtype):
+        downcast = pd.to_numeric(series, downcast="integer")
+        return downcast.dtype if downcast.dtype != dtype else None
+    # 🔹 float64 sengaja tidak diturunkan ke float32: nilainya memang sama,
+    # tetapi jumlah/agregasi dan ekspor CSV ikut berpresisi float32
+    return None
+
+
+def compact_frame(df, category_ratio=0.5):
+    """
+    Memadatkan dtype DataFrame hasil gabungan:
+    teks berulang → category, teks lain di kolom object → str (Arrow),
+    bilangan bulat → int8/16/32 jika muat; float64 dibiarkan agar jumlah dan
+    ekspor tetap berpresisi penuh. Mengembalikan (DataFrame, laporan) dengan laporan
+    {"before": byte, "after": byte, "columns": {kolom: (dtype lama, dtype baru)}}.
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    changes = {}
+    data = {}
+    for col in df.columns:
+        series = df[col]
+        target = _compact_column(series, category_ratio)
+        if target is not None:
+            data[col] = series.astype(target)
+            changes[col] = (str(series.dtype), str(data[col].dtype))
+    if data:
+        df = df.copy(deep=False)
+        for col, values in data.items():
+            df[col] = values
+    after = int(df.memory_usage(deep=True).sum())
+    return df, {"before": before, "after": after, "columns": changes}
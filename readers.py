@@ -0,0 +1,815 @@
+import codecs
+import csv
+import datetime
+import itertools
+import os
+import re
+import warnings
+import xml.etree.ElementTree as ET
+import zipfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from header_detect import HeaderDetector, combine_header_rows, header_names, header_rows, restore_int_columns
+
+
+# Teks yang oleh pd.read_excel dianggap kosong (na_values bawaan pandas)
+_NA_STRINGS = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+# ======================
+# Penampung kolom ber-chunk
+# ======================
+class ColumnBuffer:
+    """
+    Menampung baris sheet ke array kolom berukuran tetap (chunk_rows baris).
+    Setiap chunk penuh langsung dipadatkan ke dtype aslinya (int/float/datetime),
+    sehingga objek Python per sel hanya hidup selama satu chunk.
+    Baris kosong di akhir sheet tidak pernah ditulis.
+    """
+
+    def __init__(self, chunk_rows=50_000):
+        self.chunk_rows = chunk_rows
+        self.pieces = []        # per kolom: daftar Series hasil pemadatan per chunk
+        self.chunk_lengths = []
+        self._buf = []
+        self._n = 0
+        self._pending_empty = 0
+
+    def append(self, values):
+        last = len(values)
+        while last and values[last - 1] is None:
+            last -= 1
+        if last == 0:
+            # Tunda baris kosong; hanya ditulis jika masih ada data sesudahnya
+            self._pending_empty += 1
+            return
+        while self._pending_empty:
+            self._pending_empty -= 1
+            self._write(())
+        self._write(values[:last])
+
+    def _write(self, values):
+        while len(self._buf) < len(values):
+            self._buf.append(np.full(self.chunk_rows, None, dtype=object))
+            self.pieces.append([])
+        for j, value in enumerate(values):
+            self._buf[j][self._n] = value
+        self._n += 1
+        if self._n == self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._n:
+            return
+        for j, arr in enumerate(self._buf):
+            values = arr[:self._n]
+            # Sel kosong dan teks "NA"/"#N/A"/... ditulis sebagai NaN seperti pd.read_excel
+            values[pd.isna(values) | pd.Series(values, copy=False).isin(_NA_STRINGS).to_numpy()] = np.nan
+            self.pieces[j].append(pd.Series(values, copy=False).infer_objects())
+        self.chunk_lengths.append(self._n)
+        self._buf = [np.full(self.chunk_rows, None, dtype=object) for _ in self._buf]
+        self._n = 0
+
+    def to_frame(self, columns=None):
+        """
+        Menggabungkan semua chunk menjadi DataFrame, satu kolom per langkah:
+        chunk kolom dilepas begitu kolomnya tersambung, dan DataFrame dibangun
+        tanpa salinan, jadi puncak memori ≈ hasil akhir + satu kolom.
+        """
+        self._flush()
+        self._buf = []
+        n_chunks = len(self.chunk_lengths)
+        data = {}
+        for j in range(len(self.pieces)):
+            pieces, self.pieces[j] = self.pieces[j], None
+            # Kolom yang baru muncul di chunk belakang → chunk awal diisi NaN
+            missing = n_chunks - len(pieces)
+            pad = [pd.Series(np.nan, index=range(n)) for n in self.chunk_lengths[:missing]]
+            col = pieces[0] if not pad and len(pieces) == 1 else pd.concat(pad + pieces, ignore_index=True)
+            del pieces, pad
+            if col.dtype == object:
+                col = col.infer_objects()
+            data[j] = col
+        self.pieces = []
+        df = pd.DataFrame(data, copy=False)
+        if columns is not None:
+            width = max(len(columns), df.shape[1])
+            df = df.reindex(columns=range(width))
+            df.columns = header_names(list(columns) + [None] * (width - len(columns)))
+            df = restore_int_columns(df)
+        return df
+
+
+def _read_preview(rows, header_row, detector):
+    """
+    Membaca baris pratinjau dari iterator dan menentukan baris header.
+    Mengembalikan (baris pratinjau, indeks header); pratinjau kosong → ([], None).
+    """
+    preview = []
+    limit = detector.scan_depth if header_row == "auto" else header_rows(header_row)[-1] + 1
+    for row in rows:
+        preview.append(list(row))
+        if len(preview) >= limit:
+            break
+    else:
+        # Sheet lebih pendek dari pratinjau → buang baris kosong di akhir
+        while preview and all(v is None for v in preview[-1]):
+            preview.pop()
+    if not preview:
+        return preview, None
+
+    if header_row == "auto":
+        header_row = detector.detect(pd.DataFrame(preview))
+    elif isinstance(header_row, int):
+        header_row = min(header_row, len(preview) - 1)
+    return preview, header_row
+
+
+def _header_values(preview, header_row):
+    header = combine_header_rows([preview[r] for r in header_rows(header_row)])
+    while header and header[-1] is None:
+        header.pop()
+    return header
+
+
+def sheet_columns(rows, header_row="auto", detector=None):
+    """
+    Nama kolom sheet dari baris pratinjau saja (baca header tanpa isi data).
+    Nama sama persis dengan kolom hasil build_sheet_frame untuk header yang sama.
+    """
+    preview, header_row = _read_preview(iter(rows), header_row, detector or HeaderDetector())
+    if header_row is None:
+        return []
+    return header_names(_header_values(preview, header_row))
+
+
+def build_sheet_frame(rows, header_row=None, detector=None, chunk_rows=50_000,
+                      usecols=None, on_projection=None):
+    """
+    Membangun DataFrame dari iterator baris (tuple nilai sel).
+    header_row=None → tanpa header, "auto" → dideteksi oleh detector (HeaderDetector)
+    dari scan_depth baris pertama, int → baris ke-n (0-based) dipakai sebagai nama
+    kolom, tuple → header bertingkat.
+    usecols (kumpulan nama kolom) membatasi kolom yang ditampung; hanya berlaku
+    jika ada header. Posisi kolom terpilih dikirim ke on_projection(posisi)
+    supaya sumber baris bisa berhenti mendekode sel lain.
+    Mengembalikan (DataFrame, indeks baris header).
+    """
+    buffer = ColumnBuffer(chunk_rows)
+    if header_row is None:
+        for row in rows:
+            buffer.append(row)
+        return buffer.to_frame(), None
+
+    rows = iter(rows)
+    preview, header_row = _read_preview(rows, header_row, detector or HeaderDetector())
+    if not preview:
+        return pd.DataFrame(), None
+    if header_row is None:
+        # Tidak ada baris yang layak jadi header → dibaca mentah
+        for row in itertools.chain(preview, rows):
+            buffer.append(row)
+        return buffer.to_frame(), None
+    header = _header_values(preview, header_row)
+    body = preview[header_rows(header_row)[-1] + 1:]
+
+    if usecols is None:
+        for row in body:
+            buffer.append(row)
+        for row in rows:
+            buffer.append(row)
+        df = buffer.to_frame(columns=header)
+    else:
+        names = header_names(header)
+        positions = [i for i, name in enumerate(names) if name in usecols]
+        if on_projection is not None:
+            on_projection(frozenset(positions))
+        for row in itertools.chain(body, rows):
+            width = len(row)
+            buffer.append([row[i] if i < width else None for i in positions])
+        df = buffer.to_frame().reindex(columns=range(len(positions)))
+        df.columns = [names[i] for i in positions]
+        df = restore_int_columns(df)
+    df.attrs["header_row"] = header_row
+    return df, header_row
+
+
+# ======================
+# Pembaca XLSX streaming (openpyxl read_only)
+# ======================
+def read_xlsx_streaming(source, sheet_names=None, header_row=None, detector=None, chunk_rows=50_000,
+                        usecols=None):
+    """
+    Membaca sheet XLSX baris demi baris (openpyxl read_only + values_only)
+    tanpa membangun model objek workbook penuh.
+    usecols membatasi kolom yang ditampung (lihat build_sheet_frame).
+    Mengembalikan dict {nama_sheet: DataFrame}; jika header dideteksi,
+    indeksnya disimpan di df.attrs["header_row"].
+    """
+    from openpyxl import load_workbook
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        result = {}
+        for name in (sheet_names or wb.sheetnames):
+            ws = wb[name]
+            # 🔹 <dimension ref> dari eksportir bisa salah (mis. "A1") → jangan dipercaya
+            ws.reset_dimensions()
+            rows = ws.iter_rows(values_only=True)
+            result[name], _ = build_sheet_frame(rows, header_row, detector, chunk_rows, usecols)
+        return result
+    finally:
+        wb.close()
+
+
+def read_xlsx_columns(source, sheet_names=None, header_row="auto", detector=None):
+    """Nama kolom tiap sheet XLSX; hanya scan_depth baris pertama yang dibaca."""
+    from openpyxl import load_workbook
+
+    detector = detector or HeaderDetector()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        result = {}
+        for name in (sheet_names or wb.sheetnames):
+            ws = wb[name]
+            ws.reset_dimensions()
+            result[name] = sheet_columns(ws.iter_rows(max_row=detector.scan_depth, values_only=True),
+                                         header_row, detector)
+        return result
+    finally:
+        wb.close()
+
+
+# ======================
+# Pembaca ODS streaming (content.xml + iterparse)
+# ======================
+_ODS_NS = {
+    "table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
+    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
+    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
+}
+_TABLE = "{%s}table" % _ODS_NS["table"]
+_TABLE_NAME = "{%s}name" % _ODS_NS["table"]
+_ROW = "{%s}table-row" % _ODS_NS["table"]
+_CELL = "{%s}table-cell" % _ODS_NS["table"]
+_COVERED_CELL = "{%s}covered-table-cell" % _ODS_NS["table"]
+_ROWS_REPEATED = "{%s}number-rows-repeated" % _ODS_NS["table"]
+_COLS_REPEATED = "{%s}number-columns-repeated" % _ODS_NS["table"]
+_VALUE_TYPE = "{%s}value-type" % _ODS_NS["office"]
+_VALUE = "{%s}value" % _ODS_NS["office"]
+_DATE_VALUE = "{%s}date-value" % _ODS_NS["office"]
+_TIME_VALUE = "{%s}time-value" % _ODS_NS["office"]
+_BOOLEAN_VALUE = "{%s}boolean-value" % _ODS_NS["office"]
+_ANNOTATION = "{%s}annotation" % _ODS_NS["office"]
+_TEXT_S = "{%s}s" % _ODS_NS["text"]
+_TEXT_C = "{%s}c" % _ODS_NS["text"]
+_ODS_TIME = re.compile(r"PT(\d+)H(\d+)M(\d+(?:\.\d+)?)S")
+
+
+def _ods_text(elem):
+    """Teks sel ODS; text:s diganti spasi, anotasi dilewati (seperti pembaca odf pandas)."""
+    parts = [elem.text.strip("\n")] if elem.text else []
+    for child in elem:
+        if child.tag == _TEXT_S:
+            parts.append(" " * int(child.get(_TEXT_C, 1)))
+        elif child.tag != _ANNOTATION:
+            parts.append(_ods_text(child))
+        if child.tail:
+            parts.append(child.tail.strip("\n"))
+    return "".join(parts)
+
+
+def _ods_cell_value(cell):
+    """Nilai sel dibaca langsung dari atribut bertipe office:*-value."""
+    value_type = cell.get(_VALUE_TYPE)
+    if value_type is None:
+        return None
+    if value_type == "float":
+        value = float(cell.get(_VALUE))
+        return int(value) if value.is_integer() else value
+    if value_type in ("percentage", "currency"):
+        return float(cell.get(_VALUE))
+    if value_type == "date":
+        return pd.Timestamp(cell.get(_DATE_VALUE))
+    if value_type == "boolean":
+        return cell.get(_BOOLEAN_VALUE) == "true"
+    if value_type == "time":
+        match = _ODS_TIME.fullmatch(cell.get(_TIME_VALUE, ""))
+        if match:
+            hours, minutes, seconds = int(match[1]), int(match[2]), float(match[3])
+            return datetime.time(hours % 24, minutes, int(seconds), int(seconds % 1 * 1_000_000))
+    text = _ods_text(cell)
+    return text if text else None
+
+
+def _iter_ods_rows(events, table, projection=None):
+    """
+    Menghasilkan baris (list nilai) satu tabel dari event iterparse.
+    Run sel/baris kosong yang diulang hanya diperluas jika ada isi sesudahnya,
+    sehingga run kosong di akhir baris/tabel tidak pernah dibentuk.
+    Jika projection["positions"] terisi, sel di luar posisi itu tidak didekode.
+    """
+    stack = [table]
+    row = []
+    empty_cells = 0
+    empty_rows = 0
+    positions = None
+    for event, elem in events:
+        if event == "start":
+            stack.append(elem)
+            if elem.tag == _ROW:
+                row = []
+                empty_cells = 0
+                if projection:
+                    positions = projection.get("positions")
+            continue
+
+        stack.pop()
+        if elem is table:
+            return
+        if elem.tag in (_CELL, _COVERED_CELL) and stack[-1].tag == _ROW:
+            repeat = int(elem.get(_COLS_REPEATED, 1))
+            start = len(row) + empty_cells
+            wanted = positions is None or (
+                start in positions if repeat == 1 else any(start <= p < start + repeat for p in positions)
+            )
+            value = _ods_cell_value(elem) if wanted and elem.tag == _CELL else None
+            if value is None:
+                empty_cells += repeat
+            else:
+                if empty_cells:
+                    row.extend([None] * empty_cells)
+                    empty_cells = 0
+                row.extend([value] * repeat)
+            stack[-1].remove(elem)
+        elif elem.tag == _ROW:
+            repeat = int(elem.get(_ROWS_REPEATED, 1))
+            if not row:
+                empty_rows += repeat
+            else:
+                for _ in range(empty_rows):
+                    yield []
+                empty_rows = 0
+                for _ in range(repeat):
+                    yield row
+            stack[-1].remove(elem)
+
+
+def read_ods_streaming(source, sheet_names=None, header_row=None, detector=None, chunk_rows=50_000,
+                       usecols=None):
+    """
+    Membaca sheet ODS dengan men-stream content.xml dari zip (tanpa DOM odfpy).
+    Nilai bertipe (office:value, office:date-value, ...) langsung masuk ke kolom
+    numerik/tanggal. Dengan usecols, sel di luar kolom terpilih dilewati tanpa
+    didekode setelah header diketahui. Hasil sama seperti read_xlsx_streaming.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    result = {}
+    with zipfile.ZipFile(source) as zf, zf.open("content.xml") as content:
+        events = ET.iterparse(content, events=("start", "end"))
+        for event, elem in events:
+            if event != "start" or elem.tag != _TABLE:
+                continue
+            name = elem.get(_TABLE_NAME)
+            if sheet_names is not None and name not in sheet_names:
+                _skip_ods_table(events, elem)
+                elem.clear()
+                continue
+            projection = {}
+            rows = _iter_ods_rows(events, elem, projection)
+            result[name], _ = build_sheet_frame(
+                rows, header_row, detector, chunk_rows, usecols,
+                on_projection=lambda positions: projection.update(positions=positions)
+            )
+            for _ in rows:
+                pass
+            elem.clear()
+    return result
+
+
+def read_ods_columns(source, sheet_names=None, header_row="auto", detector=None):
+    """Nama kolom tiap tabel ODS; hanya scan_depth baris pertama yang didekode."""
+    detector = detector or HeaderDetector()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    result = {}
+    with zipfile.ZipFile(source) as zf, zf.open("content.xml") as content:
+        events = ET.iterparse(content, events=("start", "end"))
+        for event, elem in events:
+            if event != "start" or elem.tag != _TABLE:
+                continue
+            name = elem.get(_TABLE_NAME)
+            table_done = False
+            if sheet_names is None or name in sheet_names:
+                rows = _iter_ods_rows(events, elem)
+                result[name] = sheet_columns(
+                    itertools.islice(rows, detector.scan_depth), header_row, detector
+                )
+                # Generator yang sudah habis berarti akhir tabel sudah terbaca
+                table_done = next(rows, None) is None
+            if not table_done:
+                _skip_ods_table(events, elem)
+            elem.clear()
+            if sheet_names is not None and len(result) == len(sheet_names):
+                break
+    return result
+
+
+# ======================
+# Pembaca CSV ber-chunk dengan memori terbatas
+# ======================
+def sniff_csv(head):
+    """Menebak encoding dan pemisah kolom dari potongan awal file CSV."""
+    encoding = "latin-1"
+    for candidate in ("utf-8-sig", "cp1252"):
+        try:
+            # Byte terakhir bisa terpotong di tengah karakter multi-byte
+            text = codecs.getincrementaldecoder(candidate)().decode(head, final=False)
+            encoding = candidate
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = head.decode("latin-1")
+
+    lines = text.splitlines()
+    if len(lines) > 1:
+        lines = lines[:-1]
+    try:
+        sep = csv.Sniffer().sniff("\n".join(lines[:50]), delimiters=",;\t|").delimiter
+    except csv.Error:
+        sep = ","
+    return encoding, sep
+
+
+def _csv_column_kind(values, category_ratio=0.5):
+    """Jenis target kolom dari sampel: numeric, datetime, category, atau None (biarkan)."""
+    non_null = values.dropna()
+    if non_null.empty or pd.api.types.is_bool_dtype(values):
+        return None
+    if pd.api.types.is_numeric_dtype(values):
+        return "numeric"
+    numeric = pd.to_numeric(non_null, errors="coerce")
+    if numeric.notna().mean() >= 0.95:
+        return "numeric"
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        dates = pd.to_datetime(non_null, errors="coerce")
+    if dates.notna().mean() >= 0.95:
+        return "datetime"
+    if non_null.nunique() <= category_ratio * len(non_null):
+        return "category"
+    return None
+
+
+def _coerce_chunk(values, kind):
+    """
+    Mengonversi satu chunk kolom ke jenis hasil sampel. None jika ada nilai
+    tidak kosong yang tidak bisa dikonversi: kolom itu dibaca sebagai teks,
+    bukan dikosongkan.
+    """
+    if kind == "numeric" and not pd.api.types.is_numeric_dtype(values):
+        converted = pd.to_numeric(values, errors="coerce")
+    elif kind == "datetime" and not pd.api.types.is_datetime64_any_dtype(values):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            converted = pd.to_datetime(values, errors="coerce")
+    elif kind == "category":
+        # Chunk kategori dibaca sebagai str → kategori semua chunk (juga yang kosong) bertipe sama
+        return values.astype("str").astype("category")
+    else:
+        return values
+    if (converted.isna() & values.notna()).any():
+        return None
+    return converted
+
+
+def infer_csv_types(df, sample_rows=10_000):
+    """
+    Menentukan tipe kolom CSV yang dibaca mentah (semua teks) setelah header
+    dipilih: jenis tiap kolom dari sampel seperti read_csv_chunked, kolom yang
+    punya nilai di luar jenis itu tetap teks.
+    """
+    data = {}
+    for j in range(df.shape[1]):
+        values = df.iloc[:, j]
+        converted = _coerce_chunk(values, _csv_column_kind(values.iloc[:sample_rows]))
+        if converted is not None and converted is not values:
+            data[j] = converted
+    if data:
+        df = df.copy(deep=False)
+        for j, values in data.items():
+            df.isetitem(j, values)
+    return df
+
+
+def _csv_options(source):
+    """Opsi pd.read_csv (pemisah, encoding) dari 64 KB pertama file."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            head = f.read(64 * 1024)
+    else:
+        source.seek(0)
+        head = source.read(64 * 1024)
+        source.seek(0)
+    encoding, sep = sniff_csv(head)
+    options = {"sep": sep, "encoding": encoding, "header": None}
+    if isinstance(source, (str, os.PathLike)):
+        # File di disk (folder atau upload yang di-spool) dibaca lewat memory map
+        options["memory_map"] = True
+    return options
+
+
+def csv_shape_estimate(source):
+    """
+    Perkiraan (baris, kolom, ukuran file) CSV dari 64 KB pertama:
+    baris = ukuran file / rata-rata panjang baris, kolom = jumlah pemisah baris pertama + 1.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+        with open(source, "rb") as f:
+            head = f.read(64 * 1024)
+    else:
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(0)
+        head = source.read(64 * 1024)
+        source.seek(0)
+    encoding, sep = sniff_csv(head)
+    lines = head.splitlines()
+    if len(head) == 64 * 1024 and len(lines) > 1:
+        lines = lines[:-1]  # baris terakhir mungkin terpotong
+    if not lines:
+        return 0, 0, size
+    sample_bytes = sum(len(line) + 1 for line in lines)
+    rows = round(size * len(lines) / sample_bytes)
+    cols = lines[0].decode(encoding, errors="replace").count(sep) + 1
+    return rows, cols, size
+
+
+def _csv_header_names(preview, header_row):
+    return header_names(combine_header_rows([preview.iloc[r].tolist() for r in header_rows(header_row)]))
+
+
+def read_csv_columns(source, header_row="auto", detector=None):
+    """Nama kolom CSV; hanya scan_depth baris pertama yang dibaca."""
+    detector = detector or HeaderDetector()
+    options = _csv_options(source)
+    preview = pd.read_csv(source, nrows=detector.scan_depth, dtype=object, **options)
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    if preview.empty:
+        return []
+    if header_row == "auto":
+        header_row = detector.detect(preview)
+    elif isinstance(header_row, int):
+        header_row = min(header_row, len(preview) - 1)
+    return [] if header_row is None else _csv_header_names(preview, header_row)
+
+
+def read_csv_chunked(source, header_row=None, detector=None, sample_rows=10_000,
+                     chunk_mb=64, memory_limit_mb=None, usecols=None, chunk_rows=None):
+    """
+    Membaca CSV besar per chunk dengan memori terbatas.
+    Encoding dan pemisah ditebak dari awal file, jenis kolom (angka, tanggal,
+    kategori) ditentukan dari sampel, lalu sisa file di-stream per chunk
+    (ukuran chunk dari chunk_mb) langsung ke kolom bertipe ringkas.
+    Dengan header_row=None (mentah) semua kolom dibaca sebagai teks dan
+    df.attrs["csv_raw"] diisi; tipe ditentukan setelah header dipilih (infer_csv_types).
+    usecols (nama kolom) diteruskan ke parser sehingga kolom lain tidak dikonversi;
+    hanya berlaku jika ada header.
+    memory_limit_mb membatasi ukuran hasil; jika terlampaui → MemoryError.
+    chunk_rows (jika diisi) menggantikan ukuran chunk hasil hitungan chunk_mb.
+    Kolom yang punya nilai di luar jenis sampelnya dibaca utuh sebagai teks
+    (tidak ada nilai yang dikosongkan) dan dicatat di df.attrs["csv_text_columns"].
+    Mengembalikan DataFrame; header terdeteksi di df.attrs["header_row"].
+    """
+    is_path = isinstance(source, (str, os.PathLike))
+    options = _csv_options(source)
+
+    # 🔹 Sampel awal: deteksi header dan jenis kolom
+    detector = detector or HeaderDetector()
+    sample = pd.read_csv(source, nrows=sample_rows + detector.scan_depth, dtype=object, **options)
+    if not is_path:
+        source.seek(0)
+    if sample.empty:
+        return sample
+    if header_row == "auto":
+        header_row = detector.detect(sample)
+    skip = header_rows(header_row)[-1] + 1 if header_row is not None else 0
+    width = sample.shape[1]
+    if header_row is None:
+        names = list(range(width))
+    else:
+        names = _csv_header_names(sample, header_row)
+        if usecols is not None:
+            positions = [i for i, name in enumerate(names) if name in usecols]
+            if not positions:
+                df = pd.DataFrame()
+                df.attrs["header_row"] = header_row
+                return df
+            names = [names[i] for i in positions]
+            options["usecols"] = positions
+
+    if header_row is None:
+        # Mode mentah: baris header masih di dalam data → semua kolom teks,
+        # tipe ditentukan setelah header dipilih (infer_csv_types)
+        kinds = dict.fromkeys(names)
+        options["dtype"] = "str"
+    typed_sample = pd.read_csv(source, skiprows=skip, nrows=sample_rows, names=names, **options)
+    if not is_path:
+        source.seek(0)
+    if header_row is not None:
+        kinds = {col: _csv_column_kind(typed_sample[col]) for col in names}
+        options["dtype"] = {col: "str" for col in names if kinds[col] == "category"}
+    bytes_per_row = max(1, typed_sample.memory_usage(deep=True).sum() / max(1, len(typed_sample)))
+    chunk_rows = chunk_rows or max(1_000, int(chunk_mb * 2**20 / bytes_per_row))
+    del sample, typed_sample
+
+    # 🔹 Stream sisa file per chunk ke kolom bertipe
+    pieces = {col: [] for col in names}
+    sizes = dict.fromkeys(names, 0)
+    text_columns = []
+
+    def add_piece(col, piece):
+        pieces[col].append(piece)
+        sizes[col] += piece.memory_usage(deep=True)
+        if memory_limit_mb and sum(sizes.values()) > memory_limit_mb * 2**20:
+            raise MemoryError(f"CSV melebihi batas memori {memory_limit_mb} MB")
+
+    reader = pd.read_csv(source, skiprows=skip, names=names, chunksize=chunk_rows, **options)
+    for chunk in reader:
+        for col in names:
+            if col in text_columns:
+                continue
+            piece = _coerce_chunk(chunk[col], kinds[col])
+            if piece is None:
+                # Nilai di luar jenis sampel (mis. teks di kolom angka) → kolom dibaca ulang sebagai teks
+                text_columns.append(col)
+                pieces[col], sizes[col] = [], 0
+                continue
+            add_piece(col, piece)
+
+    if text_columns:
+        # 🔹 Satu pass tambahan hanya untuk kolom teks, tanpa konversi (nol di depan tetap utuh)
+        if not is_path:
+            source.seek(0)
+        positions = options.get("usecols") or range(len(names))
+        text_columns = [col for col in names if col in text_columns]
+        text_options = dict(options, dtype="str", usecols=[positions[names.index(col)] for col in text_columns])
+        for chunk in pd.read_csv(source, skiprows=skip, names=text_columns, chunksize=chunk_rows, **text_options):
+            for col in text_columns:
+                add_piece(col, chunk[col])
+        kinds.update(dict.fromkeys(text_columns))
+    if not is_path:
+        source.seek(0)
+
+    data = {}
+    for col in names:
+        if not pieces[col]:
+            data[col] = pd.Series(dtype=object)
+        elif kinds[col] == "category":
+            data[col] = pd.Series(union_categoricals(pieces[col], ignore_order=True))
+        else:
+            data[col] = pd.concat(pieces[col], ignore_index=True)
+        pieces[col] = None
+    df = pd.DataFrame(data)
+    if text_columns:
+        df.attrs["csv_text_columns"] = text_columns
+    if header_row is None:
+        df.attrs["csv_raw"] = True
+    else:
+        df.attrs["header_row"] = header_row
+    return df
+
+
+# ======================
+# Metadata workbook (tanpa membaca sel)
+# ======================
+_XLSX_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_XLSX_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_XLSX_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+
+
+def _xlsx_col_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - ord("A") + 1
+    return index
+
+
+def _parse_dimension(ref):
+    """'A1:F1000' → (1000, 6); None jika ref tidak ada."""
+    if not ref:
+        return None, None
+    parts = [_XLSX_CELL_REF.fullmatch(p.replace("$", "")) for p in ref.split(":")]
+    if not all(parts):
+        return None, None
+    start, end = parts[0], parts[-1]
+    rows = int(end[2]) - int(start[2]) + 1
+    cols = _xlsx_col_index(end[1]) - _xlsx_col_index(start[1]) + 1
+    return rows, cols
+
+
+def _xlsx_dimension(zf, part):
+    """Membaca <dimension ref> di awal XML sheet, berhenti sebelum <sheetData>."""
+    with zf.open(part) as fh:
+        for _, elem in ET.iterparse(fh, events=("start",)):
+            if elem.tag == "{%s}dimension" % _XLSX_MAIN:
+                return elem.get("ref")
+            if elem.tag == "{%s}sheetData" % _XLSX_MAIN:
+                return None
+    return None
+
+
+def xlsx_sheet_info(source):
+    """
+    Daftar sheet XLSX dari xl/workbook.xml beserta dimensi (<dimension ref>),
+    ukuran XML tiap sheet, dan ukuran sharedStrings.xml, tanpa membaca isi sel.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with zipfile.ZipFile(source) as zf:
+        strings = zf.NameToInfo.get("xl/sharedStrings.xml")
+        strings_bytes = strings.file_size if strings is not None else 0
+        workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+        info = []
+        for sheet in workbook.iter("{%s}sheet" % _XLSX_MAIN):
+            target = targets.get(sheet.get("{%s}id" % _XLSX_REL), "")
+            part = target.lstrip("/") if target.startswith("/") else "xl/" + target
+            if "worksheets/" not in part or part not in zf.NameToInfo:
+                continue  # chartsheet / dialogsheet tidak berisi data
+            ref = _xlsx_dimension(zf, part)
+            rows, cols = _parse_dimension(ref)
+            info.append({
+                "name": sheet.get("name"), "part": part, "dimension": ref,
+                "rows": rows, "cols": cols, "xml_bytes": zf.getinfo(part).file_size,
+                "strings_bytes": strings_bytes,
+            })
+    return info
+
+
+def _skip_ods_table(events, table):
+    """Melewati satu tabel ODS tanpa membaca nilai sel."""
+    for event, elem in events:
+        if event == "end":
+            if elem is table:
+                return
+            if elem.tag == _ROW:
+                elem.clear()
+
+
+def ods_sheet_info(source):
+    """
+    Daftar tabel ODS beserta perkiraan baris/kolom berisi.
+    Hanya atribut (office:value-type, number-*-repeated) yang diperiksa;
+    nilai sel tidak dikonversi dan run kosong di akhir tidak dihitung.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    info = []
+    with zipfile.ZipFile(source) as zf:
+        xml_bytes = zf.getinfo("content.xml").file_size
+        with zf.open("content.xml") as content:
+            current = None
+            row_count = 0
+            col = 0
+            row_has_data = False
+            for event, elem in ET.iterparse(content, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == _TABLE:
+                        current = {"name": elem.get(_TABLE_NAME), "dimension": None,
+                                   "rows": 0, "cols": 0, "xml_bytes": xml_bytes}
+                        row_count = 0
+                    elif elem.tag == _ROW:
+                        col = 0
+                        row_has_data = False
+                    continue
+                if elem.tag in (_CELL, _COVERED_CELL):
+                    repeat = int(elem.get(_COLS_REPEATED, 1))
+                    if elem.tag == _CELL and (elem.get(_VALUE_TYPE) or len(elem)):
+                        row_has_data = True
+                        current["cols"] = max(current["cols"], col + repeat)
+                    col += repeat
+                elif elem.tag == _ROW:
+                    row_count += int(elem.get(_ROWS_REPEATED, 1))
+                    if row_has_data:
+                        current["rows"] = row_count
+                    elem.clear()
+                elif elem.tag == _TABLE:
+                    info.append(current)
+                    elem.clear()
+    return info
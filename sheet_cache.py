@@ -0,0 +1,513 @@
+import datetime
+import hashlib
+import json
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# ======================
+# Hash isi file
+# ======================
+def file_hash(source, chunk_size=1 << 20):
+    """Menghitung hash SHA-1 dari isi file (path, UploadedFile, atau file-like)."""
+    h = hashlib.sha1()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+    elif hasattr(source, "getvalue"):
+        # UploadedFile Streamlit turunan BytesIO → getvalue() mengembalikan buffer
+        # bersama tanpa salinan (getbuffer() justru memaksa BytesIO menyalin isinya)
+        h.update(memoryview(source.getvalue()))
+    else:
+        pos = source.tell()
+        source.seek(0)
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            h.update(chunk)
+        source.seek(pos)
+    return h.hexdigest()
+
+
+# ======================
+# Cache parsing (LRU)
+# ======================
+def value_bytes(value):
+    """Perkiraan memori nilai cache: DataFrame dihitung deep, wadah dijumlahkan isinya."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_bytes(k) + value_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(value_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ParseCache:
+    """
+    Cache LRU untuk hasil parsing workbook, dibatasi total byte (bukan jumlah
+    entri, karena entri berisi sheet besar maupun metadata kecil).
+    Kunci: (hash isi file, engine, mode header, ...), nilai: DataFrame per sheet
+    atau metadata workbook. Entri yang baru disimpan tidak ikut dibuang.
+    """
+
+    def __init__(self, max_bytes=512 * 2**20):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._bytes -= self._sizes.get(key, 0)
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._sizes[key] = value_bytes(value)
+        self._bytes += self._sizes[key]
+        self._evict(keep=key)
+
+    def resize(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self):
+        self._data.clear()
+        self._sizes.clear()
+        self._bytes = 0
+
+    def nbytes(self):
+        return self._bytes
+
+    def _evict(self, keep=None):
+        while self._bytes > self.max_bytes and len(self._data) > (keep is not None):
+            key = next(iter(self._data))
+            if key == keep:
+                break
+            del self._data[key]
+            self._bytes -= self._sizes.pop(key)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ======================
+# Manifest folder (sinkronisasi inkremental)
+# ======================
+class FolderManifest:
+    """
+    Manifest isi folder: path → ukuran, mtime, hash isi, dan sheet hasil parsing.
+    scan() hanya menghitung ulang hash untuk file yang ukuran/mtime-nya berubah,
+    sehingga hanya file baru atau yang berubah yang perlu di-parse ulang.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def scan(self, paths):
+        """
+        Membandingkan daftar path dengan manifest.
+        Mengembalikan (path yang perlu di-parse, path yang sudah terhapus).
+        """
+        paths = list(paths)
+        current = set(paths)
+        deleted = [p for p in self.entries if p not in current]
+        for p in deleted:
+            del self.entries[p]
+
+        changed = []
+        for path in paths:
+            stat = os.stat(path)
+            entry = self.entries.get(path)
+            if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime_ns:
+                digest = file_hash(path)
+                if entry is None or entry["hash"] != digest:
+                    entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest,
+                             "sheets": None, "error": None, "format": None}
+                    self.entries[path] = entry
+                else:
+                    # Hanya mtime yang berubah (mis. disalin ulang) → isi tetap sama
+                    entry["mtime"] = stat.st_mtime_ns
+            if entry["sheets"] is None and entry["error"] is None:
+                changed.append(path)
+        return changed, deleted
+
+    def reset_sheets(self):
+        """
+        Mengosongkan sheet hasil parsing semua file (mis. pilihan kolom berubah)
+        tanpa menghitung ulang hash. Mengembalikan path yang perlu di-parse ulang.
+        """
+        for entry in self.entries.values():
+            entry["sheets"] = None
+            entry["error"] = None
+        return list(self.entries)
+
+    def hash(self, path):
+        return self.entries[path]["hash"]
+
+    def sheets(self, path):
+        return self.entries[path]["sheets"]
+
+    def error(self, path):
+        return self.entries[path]["error"]
+
+    def format(self, path):
+        return self.entries[path]["format"]
+
+    def store(self, path, sheets, error=None, fmt=None):
+        self.entries[path]["sheets"] = sheets
+        self.entries[path]["error"] = error
+        self.entries[path]["format"] = fmt
+
+    def save(self, manifest_path):
+        """Menyimpan path, ukuran, mtime, hash, dan format ke JSON (tanpa data sheet)."""
+        data = {
+            path: {k: entry[k] for k in ("size", "mtime", "hash", "format")}
+            for path, entry in self.entries.items()
+        }
+        tmp = manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, manifest_path)
+
+    @classmethod
+    def load(cls, manifest_path):
+        """Memuat manifest dari JSON; sheet diisi ulang dari cache disk saat scan."""
+        manifest = cls()
+        try:
+            with open(manifest_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        for path, entry in data.items():
+            manifest.entries[path] = {**entry, "sheets": None, "error": None}
+        return manifest
+
+
+# ======================
+# Cache kolumnar di disk (Arrow IPC + memory map)
+# ======================
+_JSON_TAGS = (
+    ("__datetime__", datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    ("__date__", datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    ("__time__", datetime.time, datetime.time.isoformat, datetime.time.fromisoformat),
+    ("__timedelta__", datetime.timedelta, datetime.timedelta.total_seconds,
+     lambda seconds: datetime.timedelta(seconds=seconds)),
+)
+
+
+def _to_json(value):
+    """
+    Nilai sel/nama kolom/attrs → bentuk JSON yang bisa dikembalikan utuh
+    (tuple, dict berkunci non-string, tanggal/waktu diberi tag). Tipe lain
+    disimpan sebagai teks; tidak ada objek yang dieksekusi saat dibaca.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or value is pd.NaT or isinstance(value, (bool, int, float, str)):
+        return None if value is pd.NaT else value
+    for tag, kind, encode, _ in _JSON_TAGS:
+        if isinstance(value, kind):
+            return {tag: encode(value)}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_to_json(v) for v in value]}
+    if isinstance(value, list):
+        return [_to_json(v) for v in value]
+    if isinstance(value, dict):
+        return {"__dict__": [[_to_json(k), _to_json(v)] for k, v in value.items()]}
+    return str(value)
+
+
+def _from_json(value):
+    if isinstance(value, list):
+        return [_from_json(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    (tag, inner), = value.items()
+    if tag == "__tuple__":
+        return tuple(_from_json(v) for v in inner)
+    if tag == "__dict__":
+        return {_from_json(k): _from_json(v) for k, v in inner}
+    for name, _, _, decode in _JSON_TAGS:
+        if tag == name:
+            return decode(inner)
+    raise ValueError(f"tag JSON tidak dikenal: {tag}")
+
+
+def private_dir(path):
+    """
+    Membuat folder hanya untuk pengguna ini (mode 0700) dan menolak folder yang
+    sudah ada tetapi milik pengguna lain atau bisa ditulis pengguna lain,
+    supaya file cache tidak bisa ditanam dari luar (mis. di /tmp bersama).
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o022):
+        raise OSError(f"folder {path} milik pengguna lain atau bisa ditulis pengguna lain")
+    return path
+
+
+class DiskSheetCache:
+    """
+    Menyimpan sheet hasil parsing ke disk dalam format Arrow IPC (Feather v2),
+    satu file per sheet, dengan kunci (hash isi, format, mode header).
+    Saat dibaca ulang file dibuka lewat memory map, jadi setelah restart
+    dataset tidak perlu di-parse lagi dari Excel/ODS.
+    Indeks (nama kolom, attrs) dan kolom yang tidak bisa disimpan Arrow (objek
+    campuran) ditulis sebagai JSON, bukan pickle; folder cache harus privat.
+    Total ukuran file dibatasi max_bytes: setelah menulis, entri yang paling lama
+    tidak dipakai (mtime indeks, diperbarui saat dibaca) dihapus dulu (LRU).
+    Entri yang baru ditulis tidak ikut dihapus.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 2**30):
+        import pyarrow  # noqa: F401  (gagal lebih awal jika pyarrow belum terpasang)
+
+        self.cache_dir = private_dir(cache_dir)
+        self.max_bytes = max_bytes
+
+    def _base(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode()).hexdigest())
+
+    def __contains__(self, key):
+        return os.path.exists(self._base(key) + ".index.json")
+
+    def get(self, key):
+        import pyarrow as pa
+
+        base = self._base(key)
+        try:
+            with open(base + ".index.json", encoding="utf-8") as f:
+                index = json.load(f)
+            # 🔹 mtime indeks = waktu terakhir dipakai (urutan LRU saat membuang entri)
+            try:
+                os.utime(base + ".index.json")
+            except OSError:
+                pass
+            sheets = {}
+            for i, entry in enumerate(index):
+                source = pa.memory_map(f"{base}.{i}.arrow")
+                df = pa.ipc.open_file(source).read_all().to_pandas()
+                if not len(df.columns):
+                    df = pd.DataFrame(index=range(entry["rows"]))
+                if entry["extra"]:
+                    with open(f"{base}.{i}.extra.json", encoding="utf-8") as f:
+                        extra = json.load(f)
+                    for label in entry["extra"]:
+                        values = np.empty(entry["rows"], dtype=object)
+                        values[:] = _from_json(extra[label])
+                        df[label] = values
+                columns = _from_json(entry["columns"])
+                df = df[[f"c{j}" for j in range(len(columns))]]
+                df.columns = columns
+                df.attrs.update(_from_json(entry["attrs"]))
+                sheets[_from_json(entry["name"])] = df
+            return sheets
+        except (OSError, ValueError, KeyError, TypeError, pa.ArrowInvalid):
+            return None
+
+    def put(self, key, sheets):
+        import pyarrow as pa
+
+        base = self._base(key)
+        index = []
+        for i, (name, df) in enumerate(sheets.items()):
+            arrays, labels, extra = [], [], {}
+            for j in range(df.shape[1]):
+                values = df.iloc[:, j]
+                try:
+                    arrays.append(pa.Array.from_pandas(values))
+                    labels.append(f"c{j}")
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                    extra[f"c{j}"] = [_to_json(v) for v in values.to_numpy()]
+            table = pa.table(arrays, names=labels)
+            with pa.OSFile(f"{base}.{i}.arrow", "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            if extra:
+                with open(f"{base}.{i}.extra.json", "w", encoding="utf-8") as f:
+                    json.dump(extra, f)
+            index.append({
+                "name": _to_json(name), "columns": _to_json(list(df.columns)), "rows": len(df),
+                "extra": list(extra), "attrs": _to_json(dict(df.attrs)),
+            })
+        # Indeks ditulis terakhir → entri hanya terlihat jika semua sheet lengkap
+        tmp = base + ".index.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, base + ".index.json")
+        self._evict(keep=os.path.basename(base))
+
+    def resize(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def nbytes(self):
+        return sum(size for _, size in self._entries().values())
+
+    def _entries(self):
+        """{nama dasar: (mtime indeks, total byte file)} untuk entri yang lengkap."""
+        mtimes, sizes = {}, {}
+        for item in os.scandir(self.cache_dir):
+            # Manifest folder ikut disimpan di sini, tetapi bukan entri sheet
+            if item.name.startswith("manifest-") or not item.is_file():
+                continue
+            try:
+                info = item.stat()
+            except OSError:
+                continue
+            base = item.name.split(".")[0]
+            sizes[base] = sizes.get(base, 0) + info.st_size
+            if item.name == base + ".index.json":
+                mtimes[base] = info.st_mtime
+        # Tanpa indeks = sedang ditulis (atau tidak lengkap) → tidak dihitung/dibuang
+        return {base: (mtimes[base], sizes[base]) for base in mtimes}
+
+    def _evict(self, keep=None):
+        entries = self._entries()
+        total = sum(size for _, size in entries.values())
+        for base in sorted(entries, key=lambda b: entries[b][0]):
+            if total <= self.max_bytes:
+                break
+            if base == keep:
+                continue
+            self._remove(base)
+            total -= entries[base][1]
+
+    def _remove(self, base):
+        # Indeks dihapus dulu → entri langsung tidak terlihat walau file sheet gagal dihapus
+        names = sorted(
+            (item.name for item in os.scandir(self.cache_dir) if item.name.split(".")[0] == base),
+            key=lambda name: not name.endswith(".index.json"),
+        )
+        for name in names:
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+
+# ======================
+# Cache dataset bersama lintas sesi (satu per proses server)
+# ======================
+class DatasetLease:
+    """Tanda bahwa satu sesi sedang memakai dataset; dilepas otomatis saat sesi dibuang."""
+
+    def __init__(self, cache, key):
+        self.key = key
+        self._finalizer = weakref.finalize(self, cache._release, key)
+
+    def release(self):
+        self._finalizer()
+
+
+class SharedDatasetCache:
+    """
+    Cache dataset gabungan read-only yang dipakai bersama semua sesi.
+    Kunci: sidik sumber (hash isi + sheet) dan pengaturan, nilai: objek dataset.
+    Jumlah sesi pemakai dihitung lewat lease; jika total memori melewati
+    max_bytes, dataset yang paling lama tidak dipakai dan tanpa lease dibuang (LRU).
+    Dataset yang masih punya lease tidak pernah dibuang.
+    Ukuran entri boleh berupa fungsi, dihitung ulang setiap kali total memori
+    diperiksa (dataset yang indeksnya dibangun belakangan ikut bertambah besar).
+    """
+
+    def __init__(self, max_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, key, value, nbytes):
+        """
+        Menyimpan dataset; jika sesi lain sudah lebih dulu menyimpan kunci yang sama,
+        dataset yang sudah ada yang dikembalikan (satu salinan per kunci).
+        nbytes = ukuran dataset dalam byte, atau fungsi tanpa argumen yang menghitungnya.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                entry = self._data[key] = {"value": value, "bytes": nbytes, "refs": 0}
+            self._data.move_to_end(key)
+            # Dataset baru tidak ikut dibuang: sesi penyimpannya langsung memakainya
+            self._evict(keep=key)
+            return entry["value"]
+
+    def lease(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data[key]["refs"] += 1
+        return DatasetLease(self, key)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry["refs"] > 0:
+                entry["refs"] -= 1
+            self._evict()
+
+    def refs(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry["refs"] if entry else 0
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def trim(self):
+        """Membuang dataset tanpa lease jika total memori (dihitung ulang) melewati batas."""
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def _size(entry):
+        nbytes = entry["bytes"]
+        return nbytes() if callable(nbytes) else nbytes
+
+    def nbytes(self):
+        with self._lock:
+            return sum(self._size(entry) for entry in self._data.values())
+
+    def _evict(self, keep=None):
+        total = self.nbytes()
+        for key in list(self._data):
+            if total <= self.max_bytes:
+                break
+            if self._data[key]["refs"] == 0 and key != keep:
+                total -= self._size(self._data.pop(key))
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,77 @@
+import io
+import os
+import shutil
+import tempfile
+import weakref
+
+
+# ======================
+# Spool upload besar ke file sementara
+# ======================
+def _upload_view(uploaded_file):
+    """
+    Isi upload sebagai memoryview tanpa salinan. getvalue() pada BytesIO yang
+    belum diubah mengembalikan objek bytes milik Streamlit apa adanya,
+    sedangkan getbuffer() memaksa BytesIO membuat salinan pribadi.
+    """
+    return memoryview(uploaded_file.getvalue())
+
+
+def memory_copies(uploaded_file):
+    """
+    Jumlah salinan utuh isi upload yang ada di memori: buffer milik Streamlit,
+    ditambah salinan pribadi BytesIO jika buffer-nya sudah tidak dibagi
+    (__sizeof__ BytesIO baru memuat isi buffer setelah dipisah).
+    """
+    size = getattr(uploaded_file, "size", None) or len(uploaded_file.getvalue())
+    owned = io.BytesIO.__sizeof__(uploaded_file) - type(uploaded_file).__basicsize__
+    return 1 + (owned >= size > 0)
+
+
+class UploadSpool:
+    """
+    Folder sementara per sesi untuk upload di atas threshold_bytes.
+    Isi upload ditulis sekali ke disk (kunci: hash isi) lalu pembaca memakai
+    path-nya (file handle / memory map), bukan buffer di memori.
+    Folder dihapus saat objek ini dibuang (sesi berakhir) atau saat proses keluar.
+    """
+
+    def __init__(self, threshold_bytes=50 * 2**20):
+        self.threshold_bytes = threshold_bytes
+        self.dir = tempfile.mkdtemp(prefix="gabung_upload_")
+        self.paths = {}
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.dir, ignore_errors=True)
+
+    def source(self, uploaded_file, content_hash):
+        """Path file sementara untuk upload besar, atau upload itu sendiri jika kecil."""
+        if uploaded_file.size < self.threshold_bytes:
+            return uploaded_file
+        path = self.paths.get(content_hash)
+        if path is None or not os.path.exists(path):
+            ext = os.path.splitext(uploaded_file.name)[1].lower()
+            path = os.path.join(self.dir, content_hash + ext)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(_upload_view(uploaded_file))
+            os.replace(tmp, path)
+            self.paths[content_hash] = path
+        return path
+
+    def retain(self, content_hashes):
+        """Menghapus file sementara untuk upload yang sudah tidak ada di daftar."""
+        keep = set(content_hashes)
+        for content_hash in [h for h in self.paths if h not in keep]:
+            try:
+                os.remove(self.paths.pop(content_hash))
+            except OSError:
+                pass
+
+    def disk_bytes(self):
+        return sum(os.path.getsize(p) for p in self.paths.values() if os.path.exists(p))
+
+    def cleanup(self):
+        self.paths.clear()
+        self._finalizer()
+
+    def __len__(self):
+        return len(self.paths)
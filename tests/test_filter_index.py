@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from filter_index import SortedIndex
+
+
+def test_top_lebih_dari_jumlah_baris():
+    index = SortedIndex(pd.Series([5.0, 1.0, 4.0, np.nan, 2.0, 3.0]))
+    assert index.top(7).tolist() == [0, 1, 2, 4, 5]
+    assert index.top(7, largest=False).tolist() == [0, 1, 2, 4, 5]
+    assert index.top(4, rows=np.array([0, 1, 3, 4])).tolist() == [0, 1, 4]
+
+
+def test_top_n_terbesar():
+    index = SortedIndex(pd.Series([5.0, 1.0, 4.0, np.nan, 2.0, 3.0]))
+    assert index.top(2).tolist() == [0, 2]
+    assert index.top(2, largest=False).tolist() == [1, 4]